@@ -1,68 +1,105 @@
 
-from agent.compile_graph import app
+from agent.compile_graph import app, checkpointer
 from agent.utils import extract_message_content
+from agent.compaction import compact_messages, record_compaction, compaction_stats
+from agent.router import route, router_stats
+from agent.tool_cache import tool_cache_stats
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langchain_core.messages import AIMessageChunk, RemoveMessage
 from datetime import datetime, timedelta
+import os
 import time
 
-last_activity = {}
-MAX_MESSAGES = 20
 INACTIVITY_TIMEOUT = timedelta(minutes=30)
 
+# Conversation store limits
+THREAD_TTL = timedelta(hours=int(os.getenv('CONVERSATION_TTL_HOURS', 24)))
+STORE_MAX_BYTES = int(os.getenv('CONVERSATION_STORE_MAX_MB', 64)) * 1024 * 1024
+CLEANUP_INTERVAL = int(os.getenv('CONVERSATION_CLEANUP_INTERVAL', 300))
+
 
 def cleanup_old_threads():
-    """Run periodically to clean up old thread states"""
+    """Run periodically to evict expired and least recently used threads"""
     print("---------------cleanup_old_threads process is running------------------")
     while True:
-        time.sleep(3600)  # Run every hour
-        
-        # Get all thread_ids that haven't been used in 24 hours
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        threads_to_clean = [
-            tid for tid, last_time in last_activity.items() 
-            if last_time < cutoff_time
-        ]
-        
-        for thread_id in threads_to_clean:
-            config = {"configurable": {"thread_id": thread_id}}
-            app.update_state(config, {"messages": []})
-            del last_activity[thread_id]
-            print(f"Cleaned up thread: {thread_id}")
+        time.sleep(CLEANUP_INTERVAL)
+        try:
+            evicted = checkpointer.evict(THREAD_TTL.total_seconds(), STORE_MAX_BYTES)
+            if evicted:
+                print(f"Cleaned up {len(evicted)} threads, store: {conversation_store_stats()}")
+        except Exception as e:
+            print(f"Thread cleanup failed: {e}")
+
+
+def conversation_store_stats():
+    """Entries, bytes and eviction counters of the shared conversation store,
+    plus this worker's prompt compaction, fast-path router and tool cache totals"""
+    return {
+        **checkpointer.stats(),
+        'compaction': dict(compaction_stats),
+        'router': dict(router_stats),
+        'tool_cache': tool_cache_stats(),
+    }
 
 # Start cleanup thread when app starts
 #cleanup_thread = threading.Thread(target=cleanup_old_threads, daemon=True)
 #cleanup_thread.start()
 
-def run_chatbot(user_input, thread_id):
-    if not thread_id:
-        thread_id = "1"
-    
+def prepare_turn(user_input, thread_id):
+    """Load, reset or compact the thread and add the user's message.
+
+    Returns (config, initial_state, reply); reply is set when the fast-path
+    router already answered and recorded the turn.
+    """
     config = {"configurable": {"thread_id": thread_id}}
     current_state = app.get_state(config)
     
-    # Check for inactivity
+    # Check for inactivity (shared across workers through the checkpoint store)
     now = datetime.now()
     should_reset = False
-    if thread_id in last_activity:
-        if now - last_activity[thread_id] > INACTIVITY_TIMEOUT:
+    last_seen = checkpointer.get_last_activity(thread_id)
+    if last_seen is not None:
+        if now - datetime.fromtimestamp(last_seen) > INACTIVITY_TIMEOUT:
             should_reset = True
     
-    last_activity[thread_id] = now
-    
     # Initialize or reset state
+    if should_reset:
+        # add_messages appends, so a stale thread has to be dropped, not overwritten
+        checkpointer.delete_thread(thread_id)
     if not current_state.values or should_reset:
         initial_state = {
             "messages": [('human', f'user_id: {thread_id}')]
         }
     else:
-        initial_state = current_state.values
-        
-        # Limit message history
-        if len(initial_state["messages"]) > MAX_MESSAGES:
-            initial_state["messages"] = [initial_state["messages"][0]] + \
-                                       initial_state["messages"][-(MAX_MESSAGES-1):]
+        # Fit the history into the prompt token budget. add_messages merges by
+        # id, so the compacted history replaces the stored one wholesale.
+        messages, before, after = compact_messages(current_state.values["messages"])
+        record_compaction(before, after)
+        print(f"prompt tokens: {before} -> {after} ({len(current_state.values['messages'])} -> {len(messages)} messages)")
+        if after < before:
+            messages = [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + messages
+        initial_state = {"messages": messages}
     
     user_message = ('human', user_input)
     initial_state["messages"].append(user_message)
+
+    # Common intents are answered without the LLM; the turn is still recorded
+    # as if the agent node had produced the reply.
+    reply = route(user_input, thread_id)
+    if reply is not None:
+        initial_state["messages"].append(('ai', reply))
+        app.update_state(config, initial_state, as_node='our-agent')
+        print('fast path reply:', reply)
+    return config, initial_state, reply
+
+def run_chatbot(user_input, thread_id):
+    if not thread_id:
+        thread_id = "1"
+
+    config, initial_state, reply = prepare_turn(user_input, thread_id)
+    if reply is not None:
+        return reply
+
     response = app.invoke(initial_state, config=config)
     
     last_message = response["messages"][-1]
@@ -71,10 +108,88 @@ def run_chatbot(user_input, thread_id):
     print("len:", len(response["messages"]), 'last content:', content)
     return content
 
+async def arun_chatbot(user_input, thread_id, run_sync):
+    """Async run_chatbot for the ASGI server. `run_sync` runs a blocking call
+    (checkpoint reads, DB queries) on the bounded worker pool."""
+    if not thread_id:
+        thread_id = "1"
+
+    config, initial_state, reply = await run_sync(prepare_turn, user_input, thread_id)
+    if reply is not None:
+        return reply
+
+    response = await app.ainvoke(initial_state, config=config)
+
+    last_message = response["messages"][-1]
+    content = extract_message_content(last_message)
+
+    print("len:", len(response["messages"]), 'last content:', content)
+    return content
+
+def _stream_events(mode, payload):
+    """Translate one LangGraph stream item into (events, final content or None)"""
+    events, content = [], None
+    if mode == 'messages':
+        chunk, metadata = payload
+        if metadata.get('langgraph_node') == 'our-agent' and isinstance(chunk, AIMessageChunk):
+            text = extract_message_content(chunk)
+            if text:
+                events.append({'type': 'token', 'text': text})
+    elif mode == 'updates':
+        for node, update in payload.items():
+            for message in (update or {}).get('messages', []):
+                if node == 'our-agent':
+                    for call in message.tool_calls:
+                        events.append({'type': 'tool_start', 'name': call['name'], 'args': call['args']})
+                    if not message.tool_calls:
+                        content = extract_message_content(message)
+                elif node == 'tools':
+                    events.append({'type': 'tool_end', 'name': message.name, 'status': message.status})
+    return events, content
+
+def stream_chatbot(user_input, thread_id):
+    """Same turn as run_chatbot, yielded as events while the graph runs:
+    model text chunks, tool start/end, and a final message."""
+    if not thread_id:
+        thread_id = "1"
+
+    config, initial_state, reply = prepare_turn(user_input, thread_id)
+    if reply is not None:
+        yield {'type': 'final', 'llm_response': reply}
+        return
+
+    content = ''
+    for mode, payload in app.stream(initial_state, config=config, stream_mode=['messages', 'updates']):
+        events, final = _stream_events(mode, payload)
+        yield from events
+        content = final if final is not None else content
+
+    print('streamed content:', content)
+    yield {'type': 'final', 'llm_response': content}
+
+async def astream_chatbot(user_input, thread_id, run_sync):
+    """Async stream_chatbot for the ASGI server"""
+    if not thread_id:
+        thread_id = "1"
+
+    config, initial_state, reply = await run_sync(prepare_turn, user_input, thread_id)
+    if reply is not None:
+        yield {'type': 'final', 'llm_response': reply}
+        return
+
+    content = ''
+    async for mode, payload in app.astream(initial_state, config=config, stream_mode=['messages', 'updates']):
+        events, final = _stream_events(mode, payload)
+        for event in events:
+            yield event
+        content = final if final is not None else content
+
+    print('streamed content:', content)
+    yield {'type': 'final', 'llm_response': content}
+
 def clear_thread_state(thread_id):
     """Clear conversation state for a specific thread"""
-    config = {"configurable": {"thread_id": thread_id}}
-    app.update_state(config, {"messages": []})
+    checkpointer.delete_thread(thread_id)
     print(f"Cleared state for thread: {thread_id}")
 
 if __name__=='__main__':
@@ -0,0 +1,417 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CHECKPOINT_DB = os.path.join(BACKEND_DIR, 'instance', 'checkpoints.db')
+
+# Serialized values larger than this are zlib-compressed before storage
+COMPRESS_THRESHOLD = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoint_threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_checkpoint_threads_updated_at ON checkpoint_threads (updated_at);
+CREATE TABLE IF NOT EXISTS checkpoint_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """Checkpoint saver backed by a single SQLite file in WAL mode.
+
+    Every gunicorn worker opens the same file, so a conversation continues
+    on whichever worker receives the next turn. Channel values are stored
+    once per version, which means a checkpoint only writes the channels that
+    changed in that step; unchanged channels keep pointing at the stored blob.
+
+    With `keep_latest_only` (the default) every put drops the thread's older
+    checkpoints, their writes and unreferenced blobs, so a thread costs one
+    checkpoint no matter how long the conversation runs. `evict` enforces a
+    TTL and a byte budget on top of that.
+    """
+
+    def __init__(self, path=None, *, serde=None, keep_latest_only=True):
+        super().__init__(serde=serde)
+        self.path = path or os.getenv('CHECKPOINT_DB_PATH', DEFAULT_CHECKPOINT_DB)
+        self.keep_latest_only = keep_latest_only
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # Pool for the async methods' blocking calls; None is the loop's default executor
+        self.executor = None
+
+    # Connections
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        # auto_vacuum only takes effect on a new file, before the first table
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    @property
+    def conn(self):
+        # One connection per thread and per process: a forked worker must
+        # never reuse the connection it inherited from the master.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.conn = self._connect()
+            self._local.pid = pid
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    # Serialization
+
+    def _dump(self, value):
+        type_, data = self.serde.dumps_typed(value)
+        if data is not None and len(data) > COMPRESS_THRESHOLD:
+            return f'{type_}+zlib', zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_, data):
+        if type_.endswith('+zlib'):
+            type_, data = type_[:-5], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # Reads
+
+    def _load_blobs(self, thread_id, checkpoint_ns, versions):
+        if not versions:
+            return {}
+        pairs = [(channel, str(version)) for channel, version in versions.items()]
+        rows = self.conn.execute(
+            'SELECT channel, type, blob FROM checkpoint_blobs '
+            'WHERE thread_id = ? AND checkpoint_ns = ? AND (channel, version) IN (VALUES '
+            + ', '.join(['(?, ?)'] * len(pairs)) + ')',
+            (thread_id, checkpoint_ns, *[value for pair in pairs for value in pair]),
+        ).fetchall()
+        return {channel: self._load(type_, blob) for channel, type_, blob in rows if type_ != 'empty'}
+
+    def _load_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        rows = self.conn.execute(
+            'SELECT task_id, idx, channel, type, value, task_path FROM checkpoint_writes '
+            'WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?',
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda row: writes_sort_key(row[5], row[0], row[1]))
+        return [(task_id, channel, self._load(type_, value)) for task_id, _, channel, type_, value, _ in rows]
+
+    def _to_tuple(self, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint = self._load(type_, checkpoint)
+        return CheckpointTuple(
+            config={
+                'configurable': {
+                    'thread_id': thread_id,
+                    'checkpoint_ns': checkpoint_ns,
+                    'checkpoint_id': checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                'channel_values': self._load_blobs(thread_id, checkpoint_ns, checkpoint['channel_versions']),
+            },
+            metadata=self._load(metadata_type, metadata),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {
+                    'configurable': {
+                        'thread_id': thread_id,
+                        'checkpoint_ns': checkpoint_ns,
+                        'checkpoint_id': parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', '')
+        columns = 'checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata'
+        if checkpoint_id := get_checkpoint_id(config):
+            row = self.conn.execute(
+                f'SELECT {columns} FROM checkpoints '
+                'WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?',
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                f'SELECT {columns} FROM checkpoints '
+                'WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1',
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = ('SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, '
+                 'type, checkpoint, metadata_type, metadata FROM checkpoints')
+        clauses, params = [], []
+        if config:
+            clauses.append('thread_id = ?')
+            params.append(config['configurable']['thread_id'])
+            if (checkpoint_ns := config['configurable'].get('checkpoint_ns')) is not None:
+                clauses.append('checkpoint_ns = ?')
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append('checkpoint_id = ?')
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append('checkpoint_id < ?')
+            params.append(before_id)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY checkpoint_id DESC'
+
+        for thread_id, checkpoint_ns, *row in self.conn.execute(query, params).fetchall():
+            if filter:
+                metadata = self._load(row[4], row[5])
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def get_last_activity(self, thread_id):
+        """Return the unix time of the last checkpoint written for a thread, or None"""
+        row = self.conn.execute(
+            'SELECT updated_at FROM checkpoint_threads WHERE thread_id = ?', (thread_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    # Writes
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable']['checkpoint_ns']
+        c = checkpoint.copy()
+        values = c.pop('channel_values')
+        blobs = []
+        for channel, version in new_versions.items():
+            type_, blob = self._dump(values[channel]) if channel in values else ('empty', None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+        type_, data = self._dump(c)
+        metadata_type, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+
+        with self._transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)', blobs)
+            conn.execute(
+                'INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (thread_id, checkpoint_ns, checkpoint['id'], config['configurable'].get('checkpoint_id'),
+                 type_, data, metadata_type, metadata_data),
+            )
+            if self.keep_latest_only:
+                self._prune(conn, thread_id, checkpoint_ns, checkpoint['id'], c['channel_versions'])
+            size = conn.execute(
+                'SELECT (SELECT coalesce(sum(length(checkpoint) + length(metadata)), 0) FROM checkpoints WHERE thread_id = ?)'
+                ' + (SELECT coalesce(sum(length(blob)), 0) FROM checkpoint_blobs WHERE thread_id = ?)'
+                ' + (SELECT coalesce(sum(length(value)), 0) FROM checkpoint_writes WHERE thread_id = ?)',
+                (thread_id, thread_id, thread_id),
+            ).fetchone()[0]
+            conn.execute(
+                'INSERT OR REPLACE INTO checkpoint_threads VALUES (?, ?, ?)', (thread_id, time.time(), size)
+            )
+        return {
+            'configurable': {
+                'thread_id': thread_id,
+                'checkpoint_ns': checkpoint_ns,
+                'checkpoint_id': checkpoint['id'],
+            }
+        }
+
+    def _prune(self, conn, thread_id, checkpoint_ns, checkpoint_id, channel_versions):
+        """Drop everything the thread's newest checkpoint no longer needs"""
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        conn.execute(
+            'DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?', key
+        )
+        conn.execute(
+            'DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?', key
+        )
+        pairs = [(channel, str(version)) for channel, version in channel_versions.items()]
+        query = 'DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?'
+        if pairs:
+            query += ' AND (channel, version) NOT IN (VALUES ' + ', '.join(['(?, ?)'] * len(pairs)) + ')'
+        conn.execute(query, (thread_id, checkpoint_ns, *[value for pair in pairs for value in pair]))
+
+    def put_writes(self, config, writes, task_id, task_path=''):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id = config['configurable']['checkpoint_id']
+        # Special writes (errors, interrupts...) have fixed negative indexes and
+        # overwrite each other; regular writes are kept if already stored.
+        replace, insert = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dump(value)
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, data, task_path)
+            (replace if idx < 0 else insert).append(row)
+        with self._transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', replace)
+            conn.executemany('INSERT OR IGNORE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', insert)
+
+    def delete_thread(self, thread_id):
+        with self._transaction() as conn:
+            self._delete_threads(conn, [thread_id])
+
+    def _delete_threads(self, conn, thread_ids):
+        for table in ('checkpoints', 'checkpoint_blobs', 'checkpoint_writes', 'checkpoint_threads'):
+            conn.executemany(f'DELETE FROM {table} WHERE thread_id = ?', [(tid,) for tid in thread_ids])
+
+    # Eviction and counters
+
+    def evict(self, ttl_seconds=None, max_bytes=None):
+        """Delete threads idle longer than `ttl_seconds`, then the least recently
+        used threads until the store fits in `max_bytes`. Returns the evicted ids."""
+        evicted = []
+        with self._transaction() as conn:
+            if ttl_seconds is not None:
+                evicted += [row[0] for row in conn.execute(
+                    'SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?', (time.time() - ttl_seconds,)
+                )]
+                self._delete_threads(conn, evicted)
+            if max_bytes is not None:
+                total = conn.execute('SELECT coalesce(sum(size_bytes), 0) FROM checkpoint_threads').fetchone()[0]
+                lru = []
+                for thread_id, size in conn.execute(
+                    'SELECT thread_id, size_bytes FROM checkpoint_threads ORDER BY updated_at'
+                ):
+                    if total <= max_bytes:
+                        break
+                    lru.append(thread_id)
+                    total -= size
+                self._delete_threads(conn, lru)
+                evicted += lru
+            if evicted:
+                conn.execute(
+                    "INSERT INTO checkpoint_counters VALUES ('evictions', ?) "
+                    'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                    (len(evicted),),
+                )
+        if evicted:
+            self.conn.execute('PRAGMA incremental_vacuum')
+        return evicted
+
+    def stats(self):
+        """Counters for the whole store, shared by every worker"""
+        entries, size = self.conn.execute(
+            'SELECT count(*), coalesce(sum(size_bytes), 0) FROM checkpoint_threads'
+        ).fetchone()
+        row = self.conn.execute("SELECT value FROM checkpoint_counters WHERE name = 'evictions'").fetchone()
+        return {
+            'entries': entries,
+            'checkpoints': self.conn.execute('SELECT count(*) FROM checkpoints').fetchone()[0],
+            'bytes': size,
+            'evictions': row[0] if row else 0,
+        }
+
+    def get_next_version(self, current, channel):
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split('.')[0])
+        return f'{current_v + 1:032}.{random.random():016}'
+
+    # Async variants run the blocking SQLite calls off the event loop, on
+    # `executor`
+
+    def _offload(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def aget_tuple(self, config):
+        return await self._offload(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await self._offload(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._offload(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=''):
+        return await self._offload(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await self._offload(self.delete_thread, thread_id)
@@ -0,0 +1,132 @@
+import json
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from agent.utils import extract_message_content
+
+# Token budget for the history sent with every model_call (system prompt excluded)
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 3000))
+# Older tool results above this size are cut down; the model can call the tool again
+TOOL_RESULT_MAX_TOKENS = int(os.getenv('TOOL_RESULT_MAX_TOKENS', 300))
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', 600))
+
+SUMMARY_ID = 'conversation-summary'
+SUMMARY_HEADER = 'Summary of the earlier conversation:'
+MESSAGE_OVERHEAD = 4
+
+# Per-process totals, reported alongside the conversation store counters
+compaction_stats = {'turns': 0, 'compacted_turns': 0, 'tokens_before': 0, 'tokens_after': 0}
+
+
+def estimate_text_tokens(text):
+    """Cheap token estimate: ~4 ASCII characters per token, Bengali and other
+    non-ASCII script closer to one token per character"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def estimate_tokens(message):
+    tokens = MESSAGE_OVERHEAD + estimate_text_tokens(str(extract_message_content(message) or ''))
+    for call in getattr(message, 'tool_calls', None) or []:
+        tokens += estimate_text_tokens(call['name'] + json.dumps(call.get('args', {}), ensure_ascii=False))
+    return tokens
+
+
+def count_tokens(messages):
+    return sum(estimate_tokens(message) for message in messages)
+
+
+def _group_turns(messages):
+    """Split messages into units that must be kept or dropped together: an AI
+    message with tool calls owns the tool results that answer it."""
+    groups = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and groups and groups[-1][0].type == 'ai':
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+def _clip(text, limit):
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def _summarize_group(group):
+    lines = []
+    for message in group:
+        text = extract_message_content(message)
+        if isinstance(message, HumanMessage):
+            lines.append(f'- user: {_clip(text, 160)}')
+        elif isinstance(message, ToolMessage):
+            lines.append(f'- {message.name or "tool"} returned: {_clip(text, 120)}')
+        elif isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                lines.append(f'- assistant called {call["name"]}({_clip(json.dumps(call["args"], ensure_ascii=False), 120)})')
+            if text:
+                lines.append(f'- assistant: {_clip(text, 160)}')
+    return lines
+
+
+def _trim_summary(lines):
+    # Keep the most recent lines that fit in the summary budget
+    kept, tokens = [], estimate_text_tokens(SUMMARY_HEADER)
+    for line in reversed(lines):
+        tokens += estimate_text_tokens(line)
+        if tokens > SUMMARY_MAX_TOKENS:
+            break
+        kept.append(line)
+    return list(reversed(kept))
+
+
+def _shrink_tool_result(message):
+    text = str(extract_message_content(message))
+    if estimate_text_tokens(text) <= TOOL_RESULT_MAX_TOKENS:
+        return message
+    clipped = text[:TOOL_RESULT_MAX_TOKENS * 2]
+    return message.model_copy(update={
+        'content': f'{clipped}… [truncated earlier result, call {message.name or "the tool"} again for full data]'
+    })
+
+
+def compact_messages(messages, budget=PROMPT_TOKEN_BUDGET):
+    """Fit a conversation into `budget` tokens.
+
+    The first message (the user_id line model_call reads) is always kept.
+    Older tool results are shrunk, then the oldest turns are folded into a
+    running summary message until the rest fits. Tool calls and their results
+    are never separated. Returns (messages, tokens_before, tokens_after).
+    """
+    before = count_tokens(messages)
+    if len(messages) < 2:
+        return list(messages), before, before
+
+    head, rest = messages[0], list(messages[1:])
+    summary_lines = []
+    if rest and rest[0].id == SUMMARY_ID:
+        summary_lines = extract_message_content(rest.pop(0)).splitlines()[1:]
+
+    groups = [[_shrink_tool_result(m) if isinstance(m, ToolMessage) else m for m in group]
+              for group in _group_turns(rest)]
+
+    def total():
+        summary = [HumanMessage(content='\n'.join([SUMMARY_HEADER] + summary_lines))] if summary_lines else []
+        return count_tokens([head] + summary + [m for group in groups for m in group])
+
+    # Always keep the latest turn, even if it alone exceeds the budget
+    while len(groups) > 1 and total() > budget:
+        summary_lines = _trim_summary(summary_lines + _summarize_group(groups.pop(0)))
+
+    compacted = [head]
+    if summary_lines:
+        compacted.append(HumanMessage(content='\n'.join([SUMMARY_HEADER] + summary_lines), id=SUMMARY_ID))
+    compacted += [m for group in groups for m in group]
+    return compacted, before, count_tokens(compacted)
+
+
+def record_compaction(before, after):
+    compaction_stats['turns'] += 1
+    compaction_stats['compacted_turns'] += after < before
+    compaction_stats['tokens_before'] += before
+    compaction_stats['tokens_after'] += after
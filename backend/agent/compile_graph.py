@@ -1,13 +1,15 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import InMemorySaver
+from agent.checkpointer import SqliteCheckpointer
 from agent.graph_state import GraphState
-from agent.nodes import tools, model_call, should_continue
+from agent.nodes import tools, model_call, amodel_call, should_continue
 
 
 graph=StateGraph(GraphState)
 
-graph.add_node('our-agent', model_call)
+# invoke/stream use model_call, ainvoke/astream amodel_call
+graph.add_node('our-agent', RunnableLambda(model_call, afunc=amodel_call))
 
 tool_node = ToolNode(tools=tools)
 
@@ -29,4 +31,5 @@ graph.add_conditional_edges(
 graph.add_edge('tools', 'our-agent')
 
 print("Graph nodes:", graph.nodes.keys())
-app = graph.compile(checkpointer=InMemorySaver())
+checkpointer = SqliteCheckpointer()
+app = graph.compile(checkpointer=checkpointer)
@@ -1,4 +1,7 @@
-
 from langchain.chat_models import init_chat_model
+from fakes import FAKE_BACKENDS, ScriptedChatModel
 # LLM
-model = init_chat_model(model="gemini-2.5-flash", temperature=0, model_provider='google_genai')
\ No newline at end of file
+if FAKE_BACKENDS:
+    model = ScriptedChatModel.from_env()
+else:
+    model = init_chat_model(model="gemini-2.5-flash", temperature=0, model_provider='google_genai')
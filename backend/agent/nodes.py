@@ -3,9 +3,14 @@ from agent.model import model
 from agent.graph_state import GraphState
 import dateparser
 from datetime import date, timedelta
-from service import book_appointment, cancel_appointment, get_doctor_list, get_user_appointments
+from service import book_appointment, cancel_appointment, get_doctor_availability, get_doctor_list, get_user_appointments
+from doctor_search import find_doctors as search_doctors
 from agent.is_date_in_schedule import is_date_in_schedule, parse_date_string
 from agent.utils import extract_message_content
+from agent.tool_cache import ToolCache
+
+# The LLM date fallback only depends on today, the schedule and the phrase
+date_cache = ToolCache('calculate_date', maxsize=2048, per_day=True, shared=True)
 
 @tool
 def is_appointment_date_in_schedule(appointment_date: str, doctor_availability:str):
@@ -15,29 +20,56 @@ def is_appointment_date_in_schedule(appointment_date: str, doctor_availability:s
 @tool
 def doctor_list():
   """This is a doctor list function that shows all doctors details."""
+  # Served from the process-local doctor directory, see service.doctor_directory
   return get_doctor_list()
 
+@tool
+def find_doctors(query: str, limit: int = 3):
+  """This is a doctor search function that finds the best matching doctors for the patient's symptoms, a specialty or a doctor's name, in English or Bengali"""
+  specialties, doctors = search_doctors(query, limit)
+  if not doctors:
+    return 'No matching doctor found, use doctor_list tool to show all doctors.'
+  return {
+    'specialties': specialties,
+    'doctors': [{key: doctor[key] for key in ('id', 'name', 'skills', 'availability')} for doctor in doctors],
+  }
+
+@tool
+def doctor_availability(doctor_id: str = '', from_date: str = '', days: int = 14):
+  """This is a doctor availability function that lists the next open dates and remaining serials of a doctor, or of all doctors when doctor_id is empty"""
+  parsed = dateparser.parse(from_date) if from_date else None
+  start = parsed.date() if parsed else None
+  doctors = get_doctor_availability([int(doctor_id)] if doctor_id else None, start, days)
+  return [{
+    'doctor_id': doctor['doctor_id'],
+    'doctor_name': doctor['doctor_name'],
+    'open_dates': [f"{day['date']} ({day['remaining']} left)" for day in doctor['days'] if day['remaining']][:7],
+  } for doctor in doctors]
+
+@date_cache.memoize
+def find_available_date(doctor_availability: str, date_info: str):
+  user=f"""
+     current date: {date.today()}
+     doctor's available days: {doctor_availability}  
+     find an available date in current year or next based on: {date_info} 
+     only answer the date of format: yyyy-mm-dd 
+    """
+  
+  response = model.invoke([
+    ('system', 'You are my AI assistant, please answer my query to the best of your ability.'),
+    ('human', user)
+  ])
+  date_str=extract_message_content(response)
+  print("available_date from calculate_date tool:", date_str)
+  return f"appointment_date: {dateparser.parse(date_str).strftime('%a, %B %d, %Y')}"
+
 @tool
 def calculate_date(doctor_availability:str, date_info:str):
   """This is a date calculation function that parse complex date information to valid date string"""
   try:
     return f'appointment_date: {parse_date_string(date_info)}'
   except:
-    
-    user=f"""
-       current date: {date.today()}
-       doctor's available days: {doctor_availability}  
-       find an available date in current year or next based on: {date_info} 
-       only answer the date of format: yyyy-mm-dd 
-      """
-    
-    response = model.invoke([
-      ('system', 'You are my AI assistant, please answer my query to the best of your ability.'),
-      ('human', user)
-    ])
-    date_str=extract_message_content(response)
-    print("available_date from calculate_date tool:", date_str)
-    return f"appointment_date: {dateparser.parse(date_str).strftime('%a, %B %d, %Y')}"
+    return find_available_date(doctor_availability, date_info)
 
 @tool
 def cancel_doctor_appointment(appointment_id: str, user_id: str):
@@ -45,23 +77,33 @@ def cancel_doctor_appointment(appointment_id: str, user_id: str):
   return cancel_appointment(appointment_id, user_id)
 
 @tool
-def get_appointment_list(user_id: str):
-  """This is a function fetching list of appointments"""
-  return get_user_appointments(user_id)
+def get_appointment_list(user_id: str, when: str = 'upcoming', limit: int = 5):
+  """This is a function fetching list of appointments: the next few upcoming ones by default, when can be 'upcoming', 'past' or 'all'"""
+  return get_user_appointments(user_id, when, limit)
 
 @tool
 def doctor_appointment(user_id: str, doctor_id: str, doctor_name: str, appointment_date:str, patient_name:str, patient_age:int):
   """This is a doctor appointment booking function"""
   return book_appointment(user_id=user_id, doctor_id=doctor_id, date=parse_date_string(appointment_date), patient_name=patient_name, patient_age=patient_age)
 
-tools=[cancel_doctor_appointment,calculate_date, doctor_appointment, doctor_list, is_appointment_date_in_schedule, get_appointment_list]
+tools=[cancel_doctor_appointment,calculate_date, doctor_appointment, doctor_list, find_doctors, doctor_availability, is_appointment_date_in_schedule, get_appointment_list]
 
 tools_model = model.bind_tools(tools)
 
-def model_call(state: GraphState):
+def agent_prompt(state: GraphState):
   print(state['messages'][0])
-  context=f"You are my AI assistant, please answer my query to the best of your ability. {state['messages'][0].content} - ask patient if he does not mention doctor name: \"doctor's name or reasoning to see a doctor\". use doctor_list tool to get doctor details. before calling doctor_appointment tool we need to take user confirmation showing all inputs."
-  response=tools_model.invoke([('system',context)]+state['messages'])
+  context=f"You are my AI assistant, please answer my query to the best of your ability. {state['messages'][0].content} - ask patient if he does not mention doctor name: \"doctor's name or reasoning to see a doctor\". use find_doctors tool with the patient's symptoms, specialty or doctor name to pick a doctor; use doctor_list tool only when all doctors are asked for. use doctor_availability tool to find when a doctor is free next. before calling doctor_appointment tool we need to take user confirmation showing all inputs."
+  return [('system',context)]+state['messages']
+
+def model_call(state: GraphState):
+  response=tools_model.invoke(agent_prompt(state))
+  state['messages']=[response]
+  return state
+
+async def amodel_call(state: GraphState):
+  # The ASGI server's graph runs await the model on the event loop, so LLM
+  # turns don't hold a worker thread while the model answers
+  response=await tools_model.ainvoke(agent_prompt(state))
   state['messages']=[response]
   return state
 
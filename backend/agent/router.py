@@ -0,0 +1,120 @@
+import os
+import re
+
+from service import cancel_appointment, get_doctor_list, get_user_appointments
+
+# Minimum confidence for answering without the LLM; anything lower goes to the graph
+ROUTER_CONFIDENCE = float(os.getenv('ROUTER_CONFIDENCE', 0.8))
+
+# Upcoming appointments listed by the fast path
+ROUTER_APPOINTMENT_LIMIT = 10
+
+router_stats = {'routed': 0, 'fallthrough': 0}
+
+BANGLA_DIGITS = str.maketrans('০১২৩৪৫৬৭৮৯', '0123456789')
+
+# Words that may surround a command without changing its meaning
+FILLER = (r'(?:please|pls|can you|could you|would you|kindly|i want to|i would like to|i wanna|'
+          r'dear|hi|hello|now|দয়া করে|প্লিজ|একটু|আমাকে|আমি|চাই|তো)')
+APPOINTMENT = r'(?:appointments?|bookings?|serials?|অ্যাপয়েন্টমেন্ট|এপয়েন্টমেন্ট|অ্যাপয়েন্টমেন্টগুলো|সিরিয়াল|বুকিং)'
+DOCTORS = r'(?:doctors?|drs?|ডাক্তার|ডাক্তারদের|ডাক্তারের|চিকিৎসক|চিকিৎসকদের)'
+NUMBER = r'(?:no\.?|number|#|নম্বর)?\s*(?P<id>\d+)'
+
+# (intent, pattern matched against the whole normalized utterance, confidence)
+RULES = [
+    ('list_appointments', rf'(?:show|list|get|see|view|check|what are|display)?\s*(?:me\s+)?(?:all\s+)?(?:my|our)\s+{APPOINTMENT}', 0.95),
+    ('list_appointments', rf'(?:আমার|আমাদের)\s+(?:সব\s+)?{APPOINTMENT}\s*(?:গুলো)?\s*(?:দেখাও|দেখান|দেখতে|দেখুন|কী|কি|তালিকা)?', 0.95),
+    # Only explicit listing wording: "see doctor" or a bare "doctor" usually starts a booking
+    ('list_doctors', rf'(?:show|list|view|display|who are)\s+(?:me\s+)?(?:the\s+)?(?:all\s+)?(?:available\s+)?{DOCTORS}(?:\s+list)?', 0.9),
+    ('list_doctors', rf'which\s+{DOCTORS}\s+(?:are|is)\s+(?:available|there)', 0.9),
+    ('list_doctors', rf'(?:the\s+)?(?:all\s+)?(?:available\s+)?{DOCTORS}\s+list', 0.9),
+    ('list_doctors', rf'(?:list of|all|available)\s+(?:the\s+)?(?:available\s+)?{DOCTORS}', 0.95),
+    ('list_doctors', rf'(?:সব\s+)?{DOCTORS}\s*(?:দের)?\s*(?:তালিকা|লিস্ট)\s*(?:দেখাও|দেখান|দিন|দাও)?', 0.95),
+    ('cancel_appointment', rf'(?:cancel|delete|remove)\s+(?:my\s+)?{APPOINTMENT}\s*{NUMBER}', 0.95),
+    ('cancel_appointment', rf'{APPOINTMENT}\s*{NUMBER}\s*(?:বাতিল|ক্যান্সেল)\s*(?:করুন|কর|করো|করে দিন|করে দাও)?', 0.95),
+]
+COMPILED_RULES = [(intent, re.compile(pattern), confidence) for intent, pattern, confidence in RULES]
+
+FILLER_RE = re.compile(rf'^(?:{FILLER}\s+)*|(?:\s+{FILLER})*$')
+
+
+def normalize(text):
+    text = text.translate(BANGLA_DIGITS).lower()
+    text = re.sub(r'[?!.,।;:"\']+', ' ', text)
+    text = ' '.join(text.split())
+    return FILLER_RE.sub('', text).strip()
+
+
+def classify(text):
+    """Return (intent, args, confidence) for an utterance, or (None, {}, 0.0).
+
+    A rule only counts when it matches the whole utterance; if rules for
+    different intents match, the utterance is ambiguous and left to the LLM.
+    """
+    normalized = normalize(text or '')
+    matches = {}
+    for intent, pattern, confidence in COMPILED_RULES:
+        match = pattern.fullmatch(normalized)
+        if match and confidence > matches.get(intent, (0, None))[0]:
+            matches[intent] = (confidence, match.groupdict())
+    if len(matches) != 1:
+        return None, {}, 0.0
+    intent, (confidence, args) = matches.popitem()
+    return intent, args, confidence
+
+
+def is_bangla(text):
+    return any('ঀ' <= ch <= '৿' for ch in text)
+
+
+def _format_appointments(appointments, bn):
+    if isinstance(appointments, dict):
+        return None
+    if not appointments:
+        return 'আপনার কোনো আসন্ন অ্যাপয়েন্টমেন্ট নেই।' if bn else 'You have no upcoming appointments.'
+    header = 'আপনার আসন্ন অ্যাপয়েন্টমেন্ট:' if bn else 'Your upcoming appointments:'
+    lines = [header]
+    for a in appointments:
+        lines.append(f"- #{a['id']} {a['doctor_name']}, {a['appointment_date']}, "
+                     f"{'রোগী' if bn else 'patient'}: {a['patient_name']}, "
+                     f"{'সিরিয়াল' if bn else 'serial'}: {a['serial_number']}")
+    return '\n'.join(lines)
+
+
+def _format_doctors(doctors, bn):
+    if not doctors:
+        return None
+    lines = ['আমাদের ডাক্তারগণ:' if bn else 'Our doctors:']
+    for d in doctors:
+        lines.append(f"- {d['name']} ({d['skills']}), {d['availability']}")
+    return '\n'.join(lines)
+
+
+def _format_cancel(result, appointment_id, bn):
+    if 'error' in result:
+        if result['error'] != 'Appointment not found':
+            return None
+        return (f'অ্যাপয়েন্টমেন্ট #{appointment_id} পাওয়া যায়নি।' if bn
+                else f'Appointment #{appointment_id} was not found.')
+    return (f'অ্যাপয়েন্টমেন্ট #{appointment_id} বাতিল করা হয়েছে।' if bn
+            else f'Appointment #{appointment_id} has been cancelled.')
+
+
+def route(text, user_id):
+    """Answer common intents straight from the service layer.
+
+    Returns the reply text, or None when the turn should go to the graph
+    (no confident match, or the service call failed).
+    """
+    intent, args, confidence = classify(text)
+    reply = None
+    if intent and confidence >= ROUTER_CONFIDENCE:
+        bn = is_bangla(text)
+        if intent == 'list_appointments':
+            reply = _format_appointments(get_user_appointments(user_id, 'upcoming', ROUTER_APPOINTMENT_LIMIT), bn)
+        elif intent == 'list_doctors':
+            reply = _format_doctors(get_doctor_list(), bn)
+        elif intent == 'cancel_appointment':
+            reply = _format_cancel(cancel_appointment(args['id'], user_id), args['id'], bn)
+    router_stats['routed' if reply else 'fallthrough'] += 1
+    return reply
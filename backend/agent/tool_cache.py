@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from agent.checkpointer import BACKEND_DIR
+
+DEFAULT_TOOL_CACHE_DB = os.path.join(BACKEND_DIR, 'instance', 'tool_cache.db')
+
+# name -> ToolCache, for reporting
+tool_caches = {}
+
+
+def normalize_key_part(value):
+    """Case-fold, drop punctuation and collapse whitespace so equivalent phrasings share a key"""
+    text = str(value).casefold()
+    text = re.sub(r'[?!.,।;:"\']+', ' ', text)
+    return ' '.join(text.split())
+
+
+class ToolCache:
+    """LRU memoization for deterministic tool results.
+
+    `per_day` entries expire at midnight, for results that depend on today's
+    date. `ttl` expires entries after a number of seconds. With `shared`, values
+    are also written to a SQLite file so other workers can reuse them.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=None, per_day=False, shared=False):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.per_day = per_day
+        self.shared_path = os.getenv('TOOL_CACHE_DB_PATH', DEFAULT_TOOL_CACHE_DB) if shared else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._purged_day = None
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+        tool_caches[name] = self
+
+    def _stamp(self):
+        return date.today().isoformat() if self.per_day else ''
+
+    def _fresh(self, stamp, created_at):
+        if self.per_day and stamp != self._stamp():
+            return False
+        return self.ttl is None or time.time() - created_at < self.ttl
+
+    # Shared store
+
+    @property
+    def _conn(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            os.makedirs(os.path.dirname(self.shared_path), exist_ok=True)
+            conn = sqlite3.connect(self.shared_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS tool_cache (name TEXT NOT NULL, key TEXT NOT NULL, '
+                'stamp TEXT NOT NULL, created_at REAL NOT NULL, value TEXT NOT NULL, PRIMARY KEY (name, key))'
+            )
+            self._local.conn, self._local.pid = conn, pid
+        return self._local.conn
+
+    def _shared_get(self, key):
+        row = self._conn.execute(
+            'SELECT stamp, created_at, value FROM tool_cache WHERE name = ? AND key = ?', (self.name, key)
+        ).fetchone()
+        if row and self._fresh(row[0], row[1]):
+            return row[0], row[1], json.loads(row[2])
+        return None
+
+    def _shared_set(self, key, stamp, created_at, value):
+        conn = self._conn
+        if self.per_day and self._purged_day != stamp:
+            conn.execute('DELETE FROM tool_cache WHERE name = ? AND stamp != ?', (self.name, stamp))
+            self._purged_day = stamp
+        conn.execute(
+            'INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?, ?)',
+            (self.name, key, stamp, created_at, json.dumps(value, ensure_ascii=False)),
+        )
+
+    # Public API
+
+    def make_key(self, *parts):
+        return '\x1f'.join(normalize_key_part(part) for part in parts)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry[0], entry[1]):
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[2]
+            self._entries.pop(key, None)
+        if self.shared_path:
+            try:
+                entry = self._shared_get(key)
+            except sqlite3.Error as e:
+                print(f"{self.name} cache read failed: {e}")
+                entry = None
+            if entry:
+                self._store(key, entry)
+                self.stats['shared_hits'] += 1
+                return entry[2]
+        self.stats['misses'] += 1
+        return default
+
+    def set(self, key, value):
+        entry = (self._stamp(), time.time(), value)
+        self._store(key, entry)
+        if self.shared_path:
+            try:
+                self._shared_set(key, *entry)
+            except sqlite3.Error as e:
+                print(f"{self.name} cache write failed: {e}")
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def memoize(self, func):
+        """Cache func's results by its normalized positional and keyword arguments"""
+        missing = object()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self.make_key(*args, *(f'{k}={v}' for k, v in sorted(kwargs.items())))
+            value = self.get(key, missing)
+            if value is missing:
+                value = func(*args, **kwargs)
+                self.set(key, value)
+            return value
+        return wrapper
+
+    def info(self):
+        return {**self.stats, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+def tool_cache_stats():
+    return {name: cache.info() for name, cache in tool_caches.items()}
@@ -1,15 +1,17 @@
 import os
 from datetime import  timedelta
 from flask_app import app
-from db import db
+from db import db, database_url, engine_options
 from init_db import init_db
 import threading
 from agent.app import cleanup_old_threads
+from archive import ARCHIVE_INTERVAL, run_archiver
 from init_db import init_db
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///appointment_system.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 # JWT Configuration from .env
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
@@ -33,6 +35,9 @@ from routes.basic_routes import *
 init_db()
 cleanup_thread = threading.Thread(target=cleanup_old_threads, daemon=True)
 cleanup_thread.start()
+if ARCHIVE_INTERVAL > 0:
+    archive_thread = threading.Thread(target=run_archiver, args=(app,), daemon=True)
+    archive_thread.start()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
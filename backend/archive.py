@@ -0,0 +1,99 @@
+"""Moves cancelled and long-past appointments into appointment_archive.
+
+Runs every ARCHIVE_INTERVAL seconds in each worker (started by app.py; 0
+disables it), or once from cron:
+
+    python archive.py
+
+Rows move in batches of ARCHIVE_BATCH_SIZE, each its own short transaction,
+and a run stops after ARCHIVE_MAX_BATCHES so it never holds the write lock
+for long. Archived rows keep their ids, so two workers racing on the same
+batch can't copy it twice.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import Appointment, AppointmentArchive, AppointmentCounter
+
+# Cancelled appointments move once their date is this many days past,
+# active ones after ARCHIVE_PAST_AFTER_DAYS
+ARCHIVE_CANCELLED_AFTER_DAYS = int(os.getenv('ARCHIVE_CANCELLED_AFTER_DAYS', 1))
+ARCHIVE_PAST_AFTER_DAYS = int(os.getenv('ARCHIVE_PAST_AFTER_DAYS', 90))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+ARCHIVE_MAX_BATCHES = int(os.getenv('ARCHIVE_MAX_BATCHES', 200))
+ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 3600))
+
+COLUMNS = ('id', 'date', 'patient_name', 'patient_age', 'serial_number', 'user_id', 'doctor_id', 'is_deleted')
+
+archive_stats = {'runs': 0, 'cancelled': 0, 'past': 0, 'last_run': None}
+
+
+def archive_appointments(now=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=ARCHIVE_MAX_BATCHES):
+    """One archival run; returns the rows moved, split into cancelled and past.
+    Needs an app context."""
+    now = now or datetime.now()
+    today = datetime.combine(now.date(), datetime.min.time())
+    cancelled_cutoff = today - timedelta(days=ARCHIVE_CANCELLED_AFTER_DAYS)
+    past_cutoff = today - timedelta(days=ARCHIVE_PAST_AFTER_DAYS)
+    due = or_(
+        and_(Appointment.is_deleted == True, Appointment.date < cancelled_cutoff),
+        Appointment.date < past_cutoff
+    )
+
+    moved = {'cancelled': 0, 'past': 0}
+    for _ in range(max_batches):
+        rows = db.session.query(*(getattr(Appointment, c) for c in COLUMNS)).filter(due).order_by(
+            Appointment.date
+        ).limit(batch_size).all()
+        if not rows:
+            break
+        try:
+            db.session.execute(insert(AppointmentArchive), [{**row._asdict(), 'archived_at': now} for row in rows])
+            db.session.execute(delete(Appointment).where(Appointment.id.in_([row.id for row in rows])))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker is archiving the same rows; leave the rest to it
+            db.session.rollback()
+            break
+        cancelled = sum(1 for row in rows if row.is_deleted)
+        moved['cancelled'] += cancelled
+        moved['past'] += len(rows) - cancelled
+        if len(rows) < batch_size:
+            break
+
+    # Serial counters of days that can no longer be booked
+    db.session.execute(delete(AppointmentCounter).where(AppointmentCounter.day < past_cutoff.date()))
+    db.session.commit()
+
+    archive_stats['runs'] += 1
+    archive_stats['cancelled'] += moved['cancelled']
+    archive_stats['past'] += moved['past']
+    archive_stats['last_run'] = now.isoformat()
+    return moved
+
+
+def run_archiver(app):
+    """Run periodically to keep the live appointment table small"""
+    print("---------------appointment archiver is running------------------")
+    while True:
+        time.sleep(ARCHIVE_INTERVAL)
+        try:
+            with app.app_context():
+                moved = archive_appointments()
+            if any(moved.values()):
+                print(f"Archived {moved['cancelled']} cancelled and {moved['past']} past appointments")
+        except Exception as e:
+            print(f"Appointment archival failed: {e}")
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        moved = archive_appointments()
+    print(f"Archived {moved['cancelled']} cancelled and {moved['past']} past appointments")
@@ -0,0 +1,240 @@
+"""ASGI entry point: the chat and voice routes run on the event loop, every
+other route is served by the Flask app through a WSGI bridge.
+
+    SERVING_MODE=async gunicorn -c gunicorn.conf.py asgi:app
+"""
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from urllib.parse import parse_qsl, urlencode
+
+import speech_recognition as sr
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from jwt.exceptions import ExpiredSignatureError, PyJWTError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from agent.app import arun_chatbot, astream_chatbot, checkpointer
+from agent.nodes import tools
+from routes.basic_routes import LANGUAGE_CONFIG, speech_response_text
+from speech import AudioDecodeError, speech_to_text
+from tts_jobs import aaudio_status, submit_tts, wait_seconds
+
+# Blocking work is bounded: DB, tool and checkpoint calls, and speech
+# recognition uploads get separate pools. The LLM is awaited on the loop, and
+# the loop's default executor is left alone for LangGraph's own small sync steps.
+DB_POOL_THREADS = int(os.getenv('ASYNC_DB_THREADS', 16))
+SPEECH_POOL_THREADS = int(os.getenv('ASYNC_SPEECH_THREADS', 32))
+WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', 16))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_THREADS, thread_name_prefix='db')
+speech_executor = ThreadPoolExecutor(max_workers=SPEECH_POOL_THREADS, thread_name_prefix='speech')
+
+
+async def run_sync(func, *args):
+    """Run a blocking call on the DB pool inside a Flask app context"""
+    def call():
+        with flask_app.app_context():
+            return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(db_executor, call)
+
+
+async def run_tool(func, **kwargs):
+    return await run_sync(partial(func, **kwargs))
+
+
+# A step's tool calls run concurrently; each gets its own app context, and so
+# its own scoped DB session, instead of sharing the request's from several threads
+for graph_tool in tools:
+    graph_tool.coroutine = partial(run_tool, graph_tool.func)
+checkpointer.executor = db_executor
+
+
+class AuthError(Exception):
+    def __init__(self, message, status):
+        self.message, self.status = message, status
+
+
+def jwt_identity(request):
+    """Same checks and error bodies as flask_jwt_extended's jwt_required()"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        raise AuthError('Authorization token is required', 422)
+    try:
+        with flask_app.app_context():
+            decoded = decode_token(header[len('Bearer '):])
+    except ExpiredSignatureError:
+        raise AuthError('Token has expired', 401)
+    except PyJWTError:
+        raise AuthError('Invalid token', 422)
+    if decoded.get('type') != 'access':
+        raise AuthError('Invalid token', 422)
+    return decoded[flask_app.config['JWT_IDENTITY_CLAIM']]
+
+
+def auth_error(e):
+    return JSONResponse({'error': e.message}, status_code=e.status)
+
+
+async def process_text(request):
+    try:
+        user_id_str = jwt_identity(request)
+    except AuthError as e:
+        return auth_error(e)
+    try:
+        data = await request.json()
+        user_text = data.get('user-text')
+        with flask_app.app_context():
+            llm_response = await arun_chatbot(user_text, user_id_str, run_sync)
+        return JSONResponse({'user_text': user_text, 'llm_response': llm_response, 'error': None})
+    except Exception as e:
+        print(f"Error processing audio: {str(e)}")
+        return JSONResponse({'error': f'Processing error: {str(e)}'}, status_code=500)
+
+
+async def process_text_stream(request):
+    try:
+        user_id_str = jwt_identity(request)
+    except AuthError as e:
+        return auth_error(e)
+    data = await request.json()
+    user_text = data.get('user-text')
+
+    async def generate():
+        yield json.dumps({'type': 'start', 'user_text': user_text}) + '\n'
+        try:
+            with flask_app.app_context():
+                async for event in astream_chatbot(user_text, user_id_str, run_sync):
+                    yield json.dumps(event, ensure_ascii=False, default=str) + '\n'
+        except Exception as e:
+            print(f"Error streaming text: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': f'Processing error: {str(e)}'}) + '\n'
+
+    return StreamingResponse(
+        generate(),
+        media_type='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+async def transcribe(request):
+    """Returns (user_text, language, None) or (None, None, error response)"""
+    form = await request.form()
+    if 'audio' not in form:
+        return None, None, JSONResponse({'error': 'No audio file provided'}, status_code=400)
+    language = form.get('language', 'en')
+    if language not in LANGUAGE_CONFIG:
+        language = 'en'
+    lang_config = LANGUAGE_CONFIG[language]
+    print(f"Processing audio in {lang_config['name']} language")
+    try:
+        user_text = await asyncio.get_running_loop().run_in_executor(
+            speech_executor, speech_to_text, form['audio'].file, lang_config['speech_code']
+        )
+    except AudioDecodeError as e:
+        return None, None, JSONResponse({'error': f'Unsupported audio: {str(e)}'}, status_code=400)
+    except sr.UnknownValueError:
+        return None, None, JSONResponse({'error': 'Could not understand audio'}, status_code=400)
+    except sr.RequestError as e:
+        return None, None, JSONResponse({'error': f'Speech recognition error: {str(e)}'}, status_code=500)
+    return user_text, language, None
+
+
+async def process_audio(request):
+    try:
+        user_id_str = jwt_identity(request)
+    except AuthError as e:
+        return auth_error(e)
+    try:
+        user_text, _, error = await transcribe(request)
+        if error:
+            return error
+        with flask_app.app_context():
+            llm_response = await arun_chatbot(user_text, user_id_str, run_sync)
+        return JSONResponse({'user_text': user_text, 'llm_response': llm_response, 'error': None})
+    except Exception as e:
+        print(f"Error processing audio: {str(e)}")
+        return JSONResponse({'error': f'Processing error: {str(e)}'}, status_code=500)
+
+
+async def process_audio_web(request):
+    try:
+        user_id_str = jwt_identity(request)
+    except AuthError as e:
+        return auth_error(e)
+    try:
+        user_text, language, error = await transcribe(request)
+        if error:
+            return error
+        unique_id = str(uuid.uuid4())
+        with flask_app.app_context():
+            llm_response = await arun_chatbot(user_text, user_id_str, run_sync)
+        llm_response, speech_text = speech_response_text(llm_response, language)
+        # Same background TTS pool as the Flask route, so GET /get-audio works for both
+        queued = submit_tts(unique_id, speech_text)
+        return JSONResponse({
+            'user_text': user_text,
+            'llm_response': llm_response,
+            'audio_id': unique_id if queued else None,
+            'audio_status': 'pending' if queued else 'unavailable',
+            'error': None,
+        })
+    except Exception as e:
+        print(f"Error processing audio: {str(e)}")
+        return JSONResponse({'error': f'Processing error: {str(e)}'}, status_code=500)
+
+
+class AudioRoute:
+    """GET /get-audio: waits for a pending TTS job on the event loop, then
+    has the Flask route answer with wait=0, so clients polling for audio don't
+    each hold one of the WSGI bridge's threads. The file itself (format
+    negotiation, Range requests) is still served by Flask."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope)
+        try:
+            wait = wait_seconds(request.query_params.get('wait'))
+        except ValueError:
+            response = JSONResponse({'error': 'wait must be a number of seconds'}, status_code=400)
+            return await response(scope, receive, send)
+        await aaudio_status(request.path_params['audio_id'], wait)
+        query = [(k, v) for k, v in parse_qsl(scope['query_string'].decode('latin-1')) if k != 'wait']
+        scope = {**scope, 'query_string': urlencode(query + [('wait', '0')]).encode('latin-1')}
+        await self.wsgi_app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    db_executor.shutdown(wait=False)
+    speech_executor.shutdown(wait=False)
+
+
+flask_wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+app = Starlette(
+    routes=[
+        Route('/process-text', process_text, methods=['POST']),
+        Route('/process-text/stream', process_text_stream, methods=['POST']),
+        Route('/process-audio', process_audio, methods=['POST']),
+        Route('/web/process-audio', process_audio_web, methods=['POST']),
+        Route('/get-audio/{audio_id}', AudioRoute(flask_wsgi), methods=['GET']),
+        Mount('/', flask_wsgi),
+    ],
+    # Same open policy as flask_cors.CORS(app); it also answers preflights for the Flask routes
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,238 @@
+"""End-to-end benchmark of the chat and voice endpoints on offline backends.
+
+Replays recorded conversations (benchmarks/conversations.json) through
+/process-text, /process-audio and /web/process-audio with the scripted chat
+model, canned recognizer and generated TTS audio from fakes.py, and reports
+p50/p95/p99 latency per endpoint and per stage plus throughput.
+
+    python benchmarks/agent_bench.py --iterations 20 --concurrency 4
+    python benchmarks/agent_bench.py --json current.json --baseline baseline.json
+
+With --baseline the run fails (exit 1) when an endpoint's p95 regresses by
+more than --max-regression.
+"""
+import argparse
+import contextvars
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='agent_bench_')
+
+# Offline backends and throwaway databases, set before the app is imported
+os.environ.setdefault('FAKE_BACKENDS', '1')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}")
+os.environ.setdefault('CHECKPOINT_DB_PATH', os.path.join(WORK_DIR, 'checkpoints.db'))
+os.environ.setdefault('TOOL_CACHE_DB_PATH', os.path.join(WORK_DIR, 'tool_cache.db'))
+os.environ.setdefault('TTS_CACHE_DIR', os.path.join(WORK_DIR, 'tts_cache'))
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import fakes  # noqa: E402
+
+ENDPOINTS = {'text': '/process-text', 'audio': '/process-audio', 'web-audio': '/web/process-audio'}
+STAGES = ('stt', 'prepare', 'llm', 'tools', 'tts')
+
+# Context variable rather than thread-local: graph tools run on executor
+# threads that inherit the request's context.
+_stages = contextvars.ContextVar('stages', default=None)
+
+
+def record(stage, seconds):
+    stages = _stages.get()
+    if stages is not None:
+        stages[stage] += seconds
+
+
+def timed(stage, func):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(stage, time.perf_counter() - start)
+    return wrapper
+
+
+class ContextExecutor:
+    """Executor proxy that runs each job in its submitter's context, so
+    background TTS is still attributed to the turn that queued it"""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class TimedModel:
+    """Proxy for the bound chat model that times every call"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def invoke(self, *args, **kwargs):
+        return timed('llm', self.model.invoke)(*args, **kwargs)
+
+
+def instrument():
+    import agent.app
+    import agent.nodes
+    import routes.basic_routes as routes
+    import tts_jobs
+
+    routes.speech_to_text = timed('stt', routes.speech_to_text)
+    # /web/process-audio synthesizes on the tts_jobs worker pool
+    tts_jobs.gen_audio_file = timed('tts', tts_jobs.gen_audio_file)
+    tts_jobs._executor = ContextExecutor(tts_jobs._executor)
+    agent.app.prepare_turn = timed('prepare', agent.app.prepare_turn)
+    agent.nodes.tools_model = TimedModel(agent.nodes.tools_model)
+    for tool in agent.nodes.tools:
+        tool.func = timed('tools', tool.func)
+
+
+def wav_upload(seconds=1.5, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(fakes.fake_pcm('x' * int(seconds / 0.06), rate=rate))
+    return buffer.getvalue()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+def run_conversation(flask_app, conversation, username, audio, results):
+    client = flask_app.test_client()
+    client.post('/register', json={'username': username, 'password': 'bench'})
+    token = client.post('/login', json={'username': username, 'password': 'bench'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    for turn in conversation['turns']:
+        endpoint = turn.get('endpoint', 'text')
+        stages = defaultdict(float)
+        _stages.set(stages)
+        start = time.perf_counter()
+        if endpoint == 'text':
+            response = client.post('/process-text', json={'user-text': turn['text']}, headers=headers)
+        else:
+            fakes.set_transcript(turn['text'])
+            response = client.post(ENDPOINTS[endpoint], headers=headers, data={
+                'audio': (io.BytesIO(audio), 'input.wav'),
+                'language': turn.get('language', 'en'),
+            })
+        elapsed = time.perf_counter() - start
+        body = response.get_json() or {}
+        if response.status_code != 200 or body.get('error'):
+            results['errors'].append(f"{conversation['name']} {endpoint} {turn['text']!r}: {response.status_code} {body}")
+        if audio_id := body.get('audio_id'):
+            # The reply's audio is synthesized in the background; fetch it as
+            # the web client does, so the tts stage is complete before it is read
+            audio_response = client.get(f'/get-audio/{audio_id}')
+            while audio_response.status_code == 202:
+                audio_response = client.get(f'/get-audio/{audio_id}')
+            if audio_response.status_code != 200:
+                results['errors'].append(f"{conversation['name']} get-audio {audio_id}: {audio_response.status_code}")
+            client.delete(f'/cleanup/{audio_id}')
+        results['endpoints'][endpoint].append(elapsed)
+        for stage, seconds in stages.items():
+            results['stages'][stage].append(seconds)
+    _stages.set(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conversations', default=os.path.join(BACKEND_DIR, 'benchmarks', 'conversations.json'))
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=1, help='untimed iterations (imports, dateparser data, caches)')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--baseline', help='report from a previous run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='allowed p95 increase (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    with open(args.conversations, encoding='utf-8') as f:
+        conversations = json.load(f)
+
+    from app import app as flask_app
+    from agent.model import model
+    model.script = {turn['text']: turn['steps'] for c in conversations for turn in c['turns'] if 'steps' in turn}
+    instrument()
+
+    audio = wav_upload()
+    for i in range(args.warmup):
+        for n, conversation in enumerate(conversations):
+            scratch = {'endpoints': defaultdict(list), 'stages': defaultdict(list), 'errors': []}
+            run_conversation(flask_app, conversation, f"warmup-{i}-{n}", audio, scratch)
+
+    results = {'endpoints': defaultdict(list), 'stages': defaultdict(list), 'errors': []}
+    jobs = [(conversation, f"bench-{i}-{n}") for i in range(args.iterations) for n, conversation in enumerate(conversations)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(run_conversation, flask_app, c, user, audio, results) for c, user in jobs]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    turns = sum(len(samples) for samples in results['endpoints'].values())
+    report = {
+        'turns': turns,
+        'wall_seconds': round(wall, 3),
+        'throughput_turns_per_s': round(turns / wall, 2) if wall else 0.0,
+        'errors': len(results['errors']),
+        'endpoints': {name: summarize(samples) for name, samples in sorted(results['endpoints'].items())},
+        'stages': {name: summarize(results['stages'][name]) for name in STAGES if results['stages'][name]},
+    }
+
+    print(f"\n{turns} turns in {wall:.2f}s ({report['throughput_turns_per_s']} turns/s), "
+          f"concurrency {args.concurrency}, {report['errors']} errors")
+    print(f"{'':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for section in ('endpoints', 'stages'):
+        for name, row in report[section].items():
+            print(f"{name:<14}{row['count']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    for error in results['errors'][:10]:
+        print('error:', error)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failed = bool(results['errors'])
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for name, row in report['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(name, {}).get('p95_ms')
+            if before and row['p95_ms'] > before * (1 + args.max_regression):
+                print(f"REGRESSION {name}: p95 {before}ms -> {row['p95_ms']}ms")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
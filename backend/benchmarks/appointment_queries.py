@@ -0,0 +1,155 @@
+"""Query plans and latency of the appointment hot paths on a large table.
+
+Fills a throwaway SQLite database with --rows appointments, drops the
+indexes to stand in for a database created before migration 1, times the
+service-layer reads, then applies migrations.migrate() to the live database
+and times them again. The SQL of every timed call is captured and shown with
+its EXPLAIN QUERY PLAN before and after.
+
+    python benchmarks/appointment_queries.py --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='appointment_queries_')
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'queries.db')}"
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import event, text  # noqa: E402
+
+from db import db  # noqa: E402
+from flask_app import app  # noqa: E402
+from migrations import migrate  # noqa: E402
+from models import Appointment  # noqa: E402
+import service  # noqa: E402
+
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+USERS = 20000
+DOCTORS = 40
+START = datetime.combine(date.today() - timedelta(days=365), datetime.min.time())
+
+
+def populate(rows, seed=7):
+    db.drop_all()
+    db.create_all()
+    connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    cursor.executemany('INSERT INTO user (id, username, password_hash) VALUES (?, ?, ?)',
+                       ((i, f'user{i}', 'x') for i in range(1, USERS + 1)))
+    cursor.executemany('INSERT INTO doctor (id, name, availability, skills) VALUES (?, ?, ?, ?)',
+                       ((i, f'Dr. {i}', 'Mon-Sat 9AM-5PM', 'MBBS') for i in range(1, DOCTORS + 1)))
+    rng = random.Random(seed)
+
+    def appointments():
+        for i in range(1, rows + 1):
+            day = START + timedelta(days=rng.randrange(730))
+            yield (i, day.strftime('%Y-%m-%d %H:%M:%S.000000'), f'patient {i}', rng.randrange(1, 90),
+                   rng.randrange(1, 60), rng.randrange(1, USERS + 1), rng.randrange(1, DOCTORS + 1),
+                   int(rng.random() < 0.1))
+    cursor.executemany(
+        'INSERT INTO appointment (id, date, patient_name, patient_age, serial_number, user_id, doctor_id, is_deleted) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', appointments())
+    connection.commit()
+    cursor.execute('ANALYZE')
+    connection.close()
+
+
+def drop_indexes():
+    """Make the database look like one created before migration 1"""
+    with db.engine.begin() as connection:
+        for name in ('ix_appointment_user_active', 'ix_appointment_doctor_date'):
+            connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        connection.execute(text('DROP TABLE IF EXISTS schema_version'))
+        connection.execute(text('ANALYZE'))
+
+
+def workload():
+    rng = random.Random(1)
+    day = datetime.combine(date.today(), datetime.min.time())
+    return {
+        'user appointments': lambda: service.get_user_appointments(str(rng.randrange(1, USERS + 1))),
+        'duplicate check': lambda: Appointment.query.filter_by(
+            user_id=rng.randrange(1, USERS + 1), doctor_id=rng.randrange(1, DOCTORS + 1), date=day,
+            patient_name='patient', is_deleted=False).first(),
+        'serial seed': lambda: serial_seed(rng.randrange(1, DOCTORS + 1), day),
+        'availability 90d': lambda: service.get_doctor_availability(None, day.date(), 90),
+        'cancel lookup': lambda: Appointment.query.filter_by(
+            id=rng.randrange(1, 1000), user_id=rng.randrange(1, USERS + 1), is_deleted=False).first(),
+    }
+
+
+def serial_seed(doctor_id, day):
+    # The read allocate_serial does on a doctor's first booking of a day
+    return db.session.query(db.func.max(Appointment.serial_number)).filter(
+        Appointment.doctor_id == doctor_id, Appointment.date >= day, Appointment.date < day + timedelta(days=1)
+    ).scalar()
+
+
+def measure(repeat):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    results = {}
+    for name, call in workload().items():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        call()
+        event.remove(db.engine, 'before_cursor_execute', capture)
+        plan = []
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                plan.extend(row[-1] for row in rows)
+        statements.clear()
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        results[name] = (samples[len(samples) // 2] * 1000, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        populate(args.rows)
+        loaded = time.perf_counter() - start
+        drop_indexes()
+        before = measure(args.repeat)
+        start = time.perf_counter()
+        applied = migrate()
+        migrated = time.perf_counter() - start
+        after = measure(args.repeat)
+
+    print(f"{args.rows} appointments loaded in {loaded:.1f}s; migrations {applied} applied in {migrated:.1f}s")
+    print(f"{'':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<20}{b:>12.2f}{a:>12.2f}{b / a:>9.1f}x")
+    for name in before:
+        print(f"\n{name}\n  before: {'; '.join(before[name][1])}\n  after:  {'; '.join(after[name][1])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Per-request latency and peak memory of speech_to_text for common uploads.
+
+Compares the previous path (save to temp_audio, probe with sr.AudioFile,
+convert with pydub and write again on failure) with the in-memory decoder in
+speech.py, on a WAV (44.1 kHz stereo), a WebM/Opus (browser MediaRecorder)
+and an M4A (phone recorder, index at the end) clip. Recognition uses the
+offline recognizer, so only decoding is measured. Needs ffmpeg; peak memory
+is the Python heap as seen by tracemalloc, ffmpeg's own memory is not counted.
+
+    python benchmarks/audio_pipeline.py --seconds 8 --repeat 20
+"""
+import argparse
+import io
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import wave
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='audio_pipeline_')
+
+os.environ.setdefault('FAKE_BACKENDS', '1')
+os.chdir(WORK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import speech_recognition as sr  # noqa: E402
+from pydub import AudioSegment  # noqa: E402
+
+from speech import Recognizer, speech_to_text  # noqa: E402
+
+FORMATS = {
+    'wav': [],
+    'webm': ['-c:a', 'libopus', '-b:a', '32k', '-f', 'webm'],
+    'm4a': ['-c:a', 'aac', '-b:a', '64k', '-f', 'ipod'],
+}
+
+
+def make_clips(seconds, rate=44100):
+    """A voiced-like signal (harmonics with syllable gating) in each format"""
+    t = np.arange(int(seconds * rate)) / rate
+    voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 8))
+    voice *= (np.sin(2 * np.pi * 3 * t) > 0) * 6000
+    voice += np.random.default_rng(0).normal(0, 200, len(t))
+    stereo = np.repeat(voice.astype(np.int16)[:, None], 2, axis=1)
+
+    wav = io.BytesIO()
+    with wave.open(wav, 'wb') as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(stereo.tobytes())
+    clips = {'wav': wav.getvalue()}
+    for name, args in FORMATS.items():
+        if args:
+            path = os.path.join(WORK_DIR, f'clip.{name}')
+            subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'wav', '-i', 'pipe:0',
+                            *args, path], input=clips['wav'], check=True)
+            with open(path, 'rb') as f:
+                clips[name] = f.read()
+    return clips
+
+
+def legacy_speech_to_text(audio_stream, speech_code):
+    """speech_to_text as it was before the in-memory decoder"""
+    temp_input_path = f'temp_audio/input_{uuid.uuid4()}.wav'
+    try:
+        with open(temp_input_path, 'wb') as f:
+            shutil.copyfileobj(audio_stream, f)
+        try:
+            with sr.AudioFile(temp_input_path):
+                pass
+        except Exception:
+            audio_stream.seek(0)
+            audio_segment = AudioSegment.from_file(audio_stream)
+            audio_segment = audio_segment.set_frame_rate(16000).set_channels(1)
+            audio_segment.export(temp_input_path, format='wav')
+        local_recognizer = Recognizer()
+        with sr.AudioFile(temp_input_path) as source:
+            local_recognizer.adjust_for_ambient_noise(source)
+            audio_data = local_recognizer.record(source)
+        return local_recognizer.recognize_google(audio_data, language=speech_code)
+    finally:
+        if os.path.exists(temp_input_path):
+            os.remove(temp_input_path)
+
+
+def measure(transcribe, data, repeat):
+    transcribe(io.BytesIO(data), 'en-US')
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transcribe(io.BytesIO(data), 'en-US')
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    transcribe(io.BytesIO(data), 'en-US')
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=8)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    os.makedirs('temp_audio', exist_ok=True)
+    clips = make_clips(args.seconds)
+    print(f"{'format':<8}{'KB':>7}{'legacy ms':>11}{'new ms':>9}{'legacy peak KB':>16}{'new peak KB':>13}")
+    for name, data in clips.items():
+        legacy_ms, legacy_kb = measure(legacy_speech_to_text, data, args.repeat)
+        new_ms, new_kb = measure(speech_to_text, data, args.repeat)
+        print(f"{name:<8}{len(data) / 1024:>7.0f}{legacy_ms:>11.1f}{new_ms:>9.1f}{legacy_kb:>16.0f}{new_kb:>13.0f}")
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""POST /appointments/bulk versus one POST /appointments per row.
+
+Imports --rows bookings spread over the seeded doctors' next working days
+into a throwaway SQLite database, then times a sample of single-row POSTs
+for comparison and checks serials stay unique and gap-free per doctor-day.
+
+    python benchmarks/bulk_booking.py --rows 10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='bulk_booking_')
+
+os.environ.setdefault('FAKE_BACKENDS', '1')
+os.environ.setdefault('GOOGLE_API_KEY', 'offline')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(WORK_DIR, 'bulk.db')}")
+os.environ.setdefault('CHECKPOINT_DB_PATH', os.path.join(WORK_DIR, 'checkpoints.db'))
+os.environ.setdefault('TOOL_CACHE_DB_PATH', os.path.join(WORK_DIR, 'tool_cache.db'))
+# --rows over few doctor-days is far past the per-day booking limit
+os.environ.setdefault('DOCTOR_DAILY_CAPACITY', '1000000')
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--single-sample', type=int, default=200, help='single-row POSTs timed for comparison')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+    from db import db
+    from models import Appointment, Doctor
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'frontdesk', 'password': 'bench'})
+    token = client.post('/login', json={'username': 'frontdesk', 'password': 'bench'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.app_context():
+        slots = [(doctor.id, day.isoformat()) for doctor in Doctor.query.all()
+                 for day in doctor.schedule.next_available_days(date.today() + timedelta(days=1), 10)]
+
+    def booking(i, prefix):
+        doctor_id, day = slots[i % len(slots)]
+        return {'doctor_id': doctor_id, 'date': day, 'patient_name': f'{prefix} {i}', 'patient_age': 20 + i % 60}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        response = client.post('/appointments/bulk', headers=headers,
+                               json={'appointments': [booking(i, 'bulk') for i in range(args.rows)]})
+        bulk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(args.single_sample):
+            client.post('/appointments', headers=headers, json=booking(i, 'single'))
+        single_seconds = (time.perf_counter() - start) / args.single_sample
+    body = response.get_json()
+
+    with app.app_context():
+        serials = defaultdict(list)
+        for doctor_id, when, serial in db.session.query(Appointment.doctor_id, Appointment.date, Appointment.serial_number):
+            serials[(doctor_id, when.date())].append(serial)
+    broken = [key for key, values in serials.items() if sorted(values) != list(range(1, len(values) + 1))]
+
+    print(f"bulk: {body['created']} created, {body['failed']} failed in {bulk_seconds:.2f}s "
+          f"({body['created'] / bulk_seconds:.0f} rows/s)")
+    print(f"single: {single_seconds * 1000:.1f} ms per POST /appointments, "
+          f"~{single_seconds * args.rows:.0f}s for {args.rows} rows")
+    print(f"{len(serials)} doctor-days, {len(broken)} with duplicate or missing serials")
+    sys.exit(1 if broken or body['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
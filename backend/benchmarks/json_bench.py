@@ -0,0 +1,73 @@
+"""Encode time and response size: Flask's default JSON provider vs FastJSONProvider.
+
+Payloads mirror the API: an appointment page with datetimes, the doctor
+directory, and a chat reply with long Bengali text.
+
+    python benchmarks/json_bench.py --repeat 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from json_provider import FastJSONProvider  # noqa: E402
+
+BENGALI = 'আপনার অ্যাপয়েন্টমেন্ট সফলভাবে বুক করা হয়েছে। ডাক্তার সোমবার থেকে শুক্রবার সকাল ৯টা থেকে বিকেল ৫টা পর্যন্ত রোগী দেখেন। '
+
+
+def payloads():
+    start = datetime(2026, 1, 5)
+    appointments = [{
+        'id': i,
+        'doctor_name': f'Dr. Doctor {i % 40}',
+        'availability': 'Mon-Fri 9AM-5PM',
+        'date': start + timedelta(days=i // 10),
+        'patient_name': f'Patient {i}',
+        'serial_number': i % 20 + 1,
+    } for i in range(500)]
+    doctors = [{
+        'id': i,
+        'name': f'Dr. Doctor {i}',
+        'specialization': 'MBBS, FCPS (MEDICINE), MD (GASTRO)',
+        'availability': 'Mon, Wed, Fri 8AM-4PM',
+    } for i in range(200)]
+    chat = {'user_text': 'আমার অ্যাপয়েন্টমেন্ট দেখাও', 'llm_response': BENGALI * 20, 'audio_id': None, 'error': None}
+    return {'appointments (500)': appointments, 'doctors (200)': doctors, 'bengali chat reply': chat}
+
+
+def measure(app, payload, repeat):
+    with app.app_context():
+        app.json.response(payload)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = app.json.response(payload)
+        elapsed = (time.perf_counter() - start) / repeat
+        return elapsed * 1e6, len(response.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    default_app, fast_app = Flask('default'), Flask('fast')
+    default_app.json = DefaultJSONProvider(default_app)
+    fast_app.json = FastJSONProvider(fast_app)
+
+    print(f"{'payload':<22}{'default us':>12}{'fast us':>10}{'speedup':>9}{'default B':>11}{'fast B':>9}")
+    for name, payload in payloads().items():
+        default_us, default_bytes = measure(default_app, payload, args.repeat)
+        fast_us, fast_bytes = measure(fast_app, payload, args.repeat)
+        print(f"{name:<22}{default_us:>12.1f}{fast_us:>10.1f}{default_us / fast_us:>8.1f}x"
+              f"{default_bytes:>11}{fast_bytes:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Concurrency stress test for appointment serial numbers.
+
+Books appointments from several processes at once through
+service.book_appointment, then checks that every (doctor, day) got serials
+1..n with no duplicates or gaps, and reports booking throughput.
+
+    python benchmarks/serial_stress.py --processes 8 --bookings 500
+    DATABASE_URL=postgresql://... python benchmarks/serial_stress.py
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='serial_stress_')
+
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(WORK_DIR, 'stress.db')}")
+# Stress the serial counter, not the per-day booking limit
+os.environ.setdefault('DOCTOR_DAILY_CAPACITY', '1000000')
+sys.path.insert(0, BACKEND_DIR)
+
+from db import db, engine_options  # noqa: E402
+from flask_app import app  # noqa: E402
+from models import Appointment, Doctor, User  # noqa: E402
+from service import book_appointment  # noqa: E402
+
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(os.environ['DATABASE_URL'])
+db.init_app(app)
+
+DOCTORS = [('Dr. Stress Daily', 'Mon-Sun 9AM-5PM'), ('Dr. Stress Weekday', 'Mon-Fri 9AM-5PM')]
+
+
+def setup():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='stress')
+        user.set_password('stress')
+        db.session.add(user)
+        db.session.add_all(Doctor(name=name, availability=availability, skills='stress') for name, availability in DOCTORS)
+        db.session.commit()
+        doctors = [(doctor.id, doctor.schedule) for doctor in Doctor.query.all()]
+        user_id = user.id
+        # Forked workers must open their own connections
+        db.session.remove()
+        db.engine.dispose()
+        return user_id, doctors
+
+
+def worker(args):
+    """Book `count` appointments; returns (booked, errors)"""
+    seed, count, user_id, slots = args
+    rng = random.Random(seed)
+    booked, errors = 0, []
+    with app.app_context():
+        for i in range(count):
+            doctor_id, day = rng.choice(slots)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = book_appointment(str(user_id), str(doctor_id), f'patient-{seed}-{i}', 30, day)
+            if 'error' in result:
+                errors.append(result['error'])
+            else:
+                booked += 1
+        db.session.remove()
+    return booked, errors
+
+
+def check():
+    """Returns a list of (doctor_id, day, problem) for serials that aren't 1..n"""
+    with app.app_context():
+        serials = defaultdict(list)
+        for doctor_id, when, serial in db.session.query(Appointment.doctor_id, Appointment.date, Appointment.serial_number):
+            serials[(doctor_id, when.date())].append(serial)
+    problems = []
+    for (doctor_id, day), values in sorted(serials.items()):
+        if sorted(values) != list(range(1, len(values) + 1)):
+            duplicates = len(values) - len(set(values))
+            problems.append((doctor_id, day, f'{len(values)} bookings, max serial {max(values)}, {duplicates} duplicates'))
+    return problems, sum(len(v) for v in serials.values()), len(serials)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=500, help='bookings per process')
+    parser.add_argument('--days', type=int, default=3, help='distinct days to spread bookings over (fewer = more contention)')
+    args = parser.parse_args()
+
+    user_id, doctors = setup()
+    slots = [(doctor_id, day.isoformat()) for doctor_id, schedule in doctors
+             for day in schedule.next_available_days(date.today() + timedelta(days=1), args.days)]
+
+    jobs = [(seed, args.bookings, user_id, slots) for seed in range(args.processes)]
+    start = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(worker, jobs)
+    wall = time.perf_counter() - start
+
+    booked = sum(count for count, _ in results)
+    errors = [error for _, errs in results for error in errs]
+    problems, rows, groups = check()
+
+    print(f"{booked} bookings from {args.processes} processes in {wall:.2f}s ({booked / wall:.0f} bookings/s)")
+    print(f"{rows} appointments over {groups} doctor-days, {len(errors)} booking errors, {len(problems)} serial problems")
+    for error in sorted(set(errors))[:5]:
+        print('error:', error)
+    for doctor_id, day, problem in problems[:10]:
+        print(f'doctor {doctor_id} {day}: {problem}')
+    sys.exit(1 if problems or booked != rows else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Write-contention benchmark for POST /appointments on SQLite.
+
+Starts --processes worker processes, each importing the full app like a
+gunicorn sync worker, and has them book appointments through the Flask test
+client against one shared SQLite file at the same time. Runs once per SQLite
+profile (db.SQLITE_PROFILE) on a fresh database and reports sustained
+bookings/s, latency and "database is locked" errors.
+
+    python benchmarks/write_contention.py --processes 8 --bookings 200
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(work_dir, profile):
+    os.environ.update({
+        'SQLITE_PROFILE': profile,
+        'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'contention.db')}",
+        'CHECKPOINT_DB_PATH': os.path.join(work_dir, 'checkpoints.db'),
+        'TOOL_CACHE_DB_PATH': os.path.join(work_dir, 'tool_cache.db'),
+        'FAKE_BACKENDS': '1',
+        'GOOGLE_API_KEY': os.environ.get('GOOGLE_API_KEY', 'offline'),
+        # Measure write contention, not the per-day booking limit
+        'DOCTOR_DAILY_CAPACITY': os.environ.get('DOCTOR_DAILY_CAPACITY', '1000000'),
+    })
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def load_app():
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+    return app
+
+
+def prepare(work_dir, profile, processes):
+    """Create the schema and one user per worker before the timed run"""
+    configure(work_dir, profile)
+    client = load_app().test_client()
+    for n in range(processes):
+        client.post('/register', json={'username': f'writer{n}', 'password': 'bench'})
+
+
+def worker(work_dir, profile, n, bookings, barrier, results):
+    import contextlib
+    import io
+    from datetime import date, timedelta
+
+    configure(work_dir, profile)
+    app = load_app()
+    from models import Doctor
+
+    client = app.test_client()
+    token = client.post('/login', json={'username': f'writer{n}', 'password': 'bench'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.app_context():
+        slots = [(doctor.id, day.isoformat()) for doctor in Doctor.query.all()
+                 for day in doctor.schedule.next_available_days(date.today() + timedelta(days=1), 5)]
+
+    latencies, errors = [], []
+    barrier.wait()
+    for i in range(bookings):
+        doctor_id, day = slots[(n + i) % len(slots)]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.post('/appointments', headers=headers, json={
+                'doctor_id': doctor_id, 'date': day, 'patient_name': f'patient {n}-{i}', 'patient_age': 30,
+            })
+        latencies.append(time.perf_counter() - start)
+        error = (response.get_json() or {}).get('error')
+        if response.status_code >= 400 or error:
+            errors.append(str(error))
+    results.put((latencies, errors))
+
+
+def run(profile, processes, bookings):
+    ctx = multiprocessing.get_context('spawn')
+    work_dir = tempfile.mkdtemp(prefix=f'write_contention_{profile}_')
+    setup = ctx.Process(target=prepare, args=(work_dir, profile, processes))
+    setup.start()
+    setup.join()
+
+    barrier, results = ctx.Barrier(processes + 1), ctx.Queue()
+    workers = [ctx.Process(target=worker, args=(work_dir, profile, n, bookings, barrier, results))
+               for n in range(processes)]
+    for process in workers:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    collected = [results.get() for _ in workers]
+    wall = time.perf_counter() - start
+    for process in workers:
+        process.join()
+
+    latencies = sorted(t for times, _ in collected for t in times)
+    errors = [e for _, errs in collected for e in errs]
+    ok = len(latencies) - len(errors)
+    return {
+        'profile': profile,
+        'ok': ok,
+        'bookings_per_s': ok / wall,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+        'locked': sum('locked' in e for e in errors),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=200, help='bookings per process')
+    parser.add_argument('--profiles', default='default,production')
+    args = parser.parse_args()
+
+    reports = [run(profile, args.processes, args.bookings) for profile in args.profiles.split(',')]
+    print(f"\n{args.processes} processes x {args.bookings} bookings")
+    print(f"{'profile':<12}{'ok':>8}{'book/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'locked':>8}{'errors':>8}")
+    for r in reports:
+        print(f"{r['profile']:<12}{r['ok']:>8}{r['bookings_per_s']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['locked']:>8}{len(r['errors']):>8}")
+    for r in reports:
+        for error in sorted(set(r['errors']))[:3]:
+            print(f"{r['profile']} error: {error}")
+
+
+if __name__ == '__main__':
+    main()
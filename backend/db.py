@@ -1,2 +1,96 @@
+import os
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+db = SQLAlchemy()
+
+# SQLite connection profile. 'production' applies the pragmas below to every
+# connection; 'default' leaves the driver defaults (rollback journal, 5s busy
+# timeout, synchronous=FULL).
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'production')
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000))
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', 256))
+SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', 32))
+
+
+# Pool settings, for any DATABASE_URL. Unset values use the per-dialect
+# defaults in engine_options().
+DB_POOL_SIZE = os.getenv('DB_POOL_SIZE')
+DB_MAX_OVERFLOW = os.getenv('DB_MAX_OVERFLOW')
+DB_POOL_TIMEOUT = os.getenv('DB_POOL_TIMEOUT')
+DB_POOL_RECYCLE = os.getenv('DB_POOL_RECYCLE')
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING')
+
+
+def database_url(default='sqlite:///appointment_system.db'):
+    """DATABASE_URL, accepting the postgres:// scheme some hosts hand out.
+
+    A Postgres URL without a driver is pinned to psycopg 3, the driver in
+    requirements.txt; SQLAlchemy before 2.1 would otherwise pick psycopg2.
+    """
+    url = os.getenv('DATABASE_URL', default)
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            url = 'postgresql+psycopg://' + url[len(scheme):]
+    return url
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    The pool lives per worker process, so connection setup (and the SQLite
+    pragmas) is paid once per pooled connection, not per request.
+    """
+    if uri.startswith('sqlite'):
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        # Connections are cheap; a sync worker needs one, an async worker one
+        # per DB/WSGI thread, so allow overflow instead of queueing.
+        options = {'pool_size': 5, 'max_overflow': 32, 'pool_timeout': 30}
+    else:
+        # Server connections are dropped by proxies and restarts; check them
+        # on checkout and replace them before typical idle timeouts.
+        options = {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30,
+                   'pool_pre_ping': True, 'pool_recycle': 1800}
+
+    for key, value, cast in (
+        ('pool_size', DB_POOL_SIZE, int),
+        ('max_overflow', DB_MAX_OVERFLOW, int),
+        ('pool_timeout', DB_POOL_TIMEOUT, float),
+        ('pool_recycle', DB_POOL_RECYCLE, int),
+        ('pool_pre_ping', DB_POOL_PRE_PING, lambda v: v.lower() in ('1', 'true', 'yes')),
+    ):
+        if value is not None:
+            options[key] = cast(value)
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def on_connect(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+    if SQLITE_PROFILE != 'production' or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL only syncs at
+    # checkpoints, which is safe in WAL mode
+    cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}')
+    cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}')
+    cursor.close()
+
+
+@event.listens_for(Engine, 'checkout')
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    # Never hand a connection opened before a fork (gunicorn --preload,
+    # multiprocessing) to the child; the pool replaces it with a fresh one
+    pid = os.getpid()
+    if connection_record.info.get('pid') != pid:
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise exc.DisconnectionError(f'Connection record belongs to pid {connection_record.info.get("pid")}, attempting to check out in pid {pid}')
@@ -0,0 +1,213 @@
+"""Symptom and specialty search over the doctor directory.
+
+Doctor skills ("MBBS, FCPS (OBS & Gynae)") are normalized into specialties
+and indexed as specialty -> doctor ids, alongside plain skill and name
+tokens. A query is expanded through an English/Bengali symptom map ("pregnancy",
+"পেটে ব্যথা", "child specialist") into specialties, and doctors are ranked
+by how many of those, and of the remaining query words, they match.
+
+The index is rebuilt only when service.doctor_directory() changes.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import NamedTuple
+
+from service import doctor_directory
+
+# Specialty -> terms that signal it in a skills string. Terms of four or more
+# letters match as word prefixes ("gastro" matches "gastroenterology").
+SPECIALTY_TERMS = {
+    'gynecology': ('gynae', 'gynecology', 'gyne', 'obs', 'obstetrics', 'dgo'),
+    'internal medicine': ('medicine',),
+    'gastroenterology': ('gastro', 'hepatology', 'liver'),
+    'pediatrics': ('pediatric', 'paediatric', 'child'),
+    'neonatology': ('newborn', 'neonat'),
+    'cardiology': ('cardio', 'heart'),
+    'dermatology': ('derma', 'skin', 'venereology'),
+    'orthopedics': ('ortho', 'bone', 'fracture'),
+    'ent': ('ent', 'otolaryngology'),
+    'ophthalmology': ('ophthalm', 'eye', 'dco'),
+    'neurology': ('neuro',),
+    'psychiatry': ('psychiatr', 'mental'),
+    'dentistry': ('bds', 'dental'),
+    'urology': ('urology', 'kidney'),
+    'anesthesiology': ('anaesthe', 'anesthe', 'dac'),
+}
+
+# Symptom or lay term -> specialties that treat it. English keys match whole
+# words, plurals included; a key ending in '*' is a stem that also matches
+# longer words ('pregnan*': pregnancy, pregnant). Bengali keys match whole
+# words with an optional case or article ending (BENGALI_SUFFIXES), so 'পেটে'
+# and 'বাচ্চার' are found but 'নাকি' and 'দোকানে' do not match 'নাক' and 'কান';
+# Bengali stems ('গর্ভ*': গর্ভবতী) are marked the same way.
+SYMPTOMS = {
+    # Women's health
+    'pregnan*': ('gynecology',), 'period': ('gynecology',), 'menstrua*': ('gynecology',),
+    'gynecologist': ('gynecology',), 'gynae*': ('gynecology',), 'obstetric*': ('gynecology',),
+    'women': ('gynecology',), 'woman': ('gynecology',), 'গর্ভ*': ('gynecology',),
+    'প্রেগন্যান্ট': ('gynecology',), 'মাসিক': ('gynecology',),
+    'গাইনি': ('gynecology',), 'প্রসব*': ('gynecology',), 'স্ত্রীরোগ': ('gynecology',),
+    # Children
+    'child': ('pediatrics',), 'children': ('pediatrics',), 'kid': ('pediatrics',),
+    'baby': ('pediatrics', 'neonatology'), 'babies': ('pediatrics', 'neonatology'),
+    'infant': ('pediatrics', 'neonatology'), 'pediatric*': ('pediatrics',), 'paediatric*': ('pediatrics',),
+    'newborn': ('neonatology', 'pediatrics'), 'শিশু': ('pediatrics',), 'বাচ্চা': ('pediatrics',),
+    'নবজাতক': ('neonatology', 'pediatrics'),
+    # Stomach and liver
+    'stomach*': ('gastroenterology',), 'abdom*': ('gastroenterology',), 'gastri*': ('gastroenterology',),
+    'acidity': ('gastroenterology',), 'ulcer': ('gastroenterology',), 'diarrh*': ('gastroenterology',),
+    'vomit*': ('gastroenterology',), 'constipat*': ('gastroenterology',), 'liver': ('gastroenterology',),
+    'jaundice': ('gastroenterology',), 'hepatitis': ('gastroenterology',), 'পেট': ('gastroenterology',),
+    'গ্যাস্ট্রিক': ('gastroenterology',), 'ডায়রিয়া': ('gastroenterology',), 'বমি': ('gastroenterology',),
+    'জন্ডিস': ('gastroenterology',), 'লিভার': ('gastroenterology',), 'আলসার': ('gastroenterology',),
+    # General medicine
+    'fever*': ('internal medicine',), 'cough*': ('internal medicine',), 'cold': ('internal medicine',),
+    'diabet*': ('internal medicine',), 'blood pressure': ('internal medicine', 'cardiology'),
+    'hypertension': ('internal medicine', 'cardiology'), 'weakness': ('internal medicine',),
+    'headache': ('internal medicine', 'neurology'), 'medicine': ('internal medicine',),
+    'জ্বর': ('internal medicine',), 'কাশি': ('internal medicine',), 'সর্দি': ('internal medicine',),
+    'ডায়াবেটিস': ('internal medicine',), 'প্রেশার': ('internal medicine', 'cardiology'),
+    'দুর্বল*': ('internal medicine',), 'মাথাব্যথা': ('internal medicine', 'neurology'),
+    'মাথা ব্যথা': ('internal medicine', 'neurology'), 'মেডিসিন': ('internal medicine',),
+    # Other specialties, for a growing directory
+    'chest pain': ('cardiology',), 'heart': ('cardiology',), 'palpitation': ('cardiology',),
+    'বুকে ব্যথা': ('cardiology',), 'হৃদ*': ('cardiology',), 'হার্ট': ('cardiology',),
+    'skin': ('dermatology',), 'rash': ('dermatology',), 'itch*': ('dermatology',), 'acne': ('dermatology',),
+    'চর্ম*': ('dermatology',), 'চুলকানি': ('dermatology',), 'ত্বক': ('dermatology',),
+    'bone': ('orthopedics',), 'joint': ('orthopedics',), 'fracture': ('orthopedics',), 'back pain': ('orthopedics',),
+    'হাড়': ('orthopedics',), 'জয়েন্ট': ('orthopedics',), 'কোমর': ('orthopedics',),
+    'ear': ('ent',), 'nose': ('ent',), 'throat': ('ent',), 'sinus*': ('ent',),
+    'কান': ('ent',), 'নাক': ('ent',), 'গলা': ('ent',),
+    'eye': ('ophthalmology',), 'vision': ('ophthalmology',), 'চোখ': ('ophthalmology',),
+    'seizure': ('neurology',), 'stroke': ('neurology',), 'numb': ('neurology',), 'numbness': ('neurology',),
+    'খিঁচুনি': ('neurology',),
+    'anxiety': ('psychiatry',), 'depress*': ('psychiatry',), 'insomnia': ('psychiatry',), 'মানসিক': ('psychiatry',),
+    'tooth': ('dentistry',), 'teeth': ('dentistry',), 'dental': ('dentistry',), 'দাঁত': ('dentistry',),
+    'urine': ('urology',), 'kidney': ('urology',), 'প্রস্রাব': ('urology',), 'কিডনি': ('urology',),
+}
+
+# Words that carry no signal on their own
+STOPWORDS = {
+    'doctor', 'dr', 'the', 'and', 'for', 'with', 'have', 'has', 'need', 'want', 'see', 'who', 'can',
+    'treat', 'specialist', 'problem', 'pain', 'mbbs', 'fcps', 'mcps', 'md', 'bcs', 'part', 'health',
+    'ডাক্তার', 'আমার', 'আছে', 'সমস্যা', 'ব্যথা', 'জন্য', 'দেখাতে', 'চাই',
+}
+
+SPECIALTY_WEIGHT = 3.0
+NAME_WEIGHT = 2.0
+TOKEN_WEIGHT = 1.0
+
+SPACED_LETTERS_RE = re.compile(r'\b(?:[A-Za-z] )+[A-Za-z]\b')
+TOKEN_RE = re.compile(r'[a-z0-9]+|[ঀ-৿]+')
+# Case endings and articles a Bengali key may carry: পেটে, বাচ্চার, গলায়, দাঁতের, বাচ্চাটা
+BENGALI_SUFFIXES = ('ে', 'র', 'ের', 'য়', 'য়ে', 'য়ের', 'কে', 'তে', 'টা', 'টি', 'টার', 'টির', 'ও', 'ই', 'রা', 'দের', 'গুলো')
+
+# One group per key, longest first, so match.lastindex names the key
+SYMPTOM_KEYS = sorted(SYMPTOMS, key=len, reverse=True)
+
+
+def _symptom_pattern(key):
+    if not key.isascii():
+        if key.endswith('*'):
+            return rf'(?<![ঀ-৿]){re.escape(key[:-1])}[ঀ-৿]*'
+        suffixes = '|'.join(sorted(BENGALI_SUFFIXES, key=len, reverse=True))
+        return rf'(?<![ঀ-৿]){re.escape(key)}(?:{suffixes})?(?![ঀ-৿])'
+    if key.endswith('*'):
+        return rf'(?<![a-z]){re.escape(key[:-1])}[a-z]*'
+    return rf'(?<![a-z]){re.escape(key)}(?:e?s)?(?![a-z])'
+
+
+SYMPTOM_RE = re.compile('|'.join(f'({_symptom_pattern(key)})' for key in SYMPTOM_KEYS))
+
+
+def normalize(text):
+    """Lowercase, NFC (one spelling of য়), and join spelled-out degrees: 'F C P S' -> 'fcps'"""
+    text = SPACED_LETTERS_RE.sub(lambda m: m.group().replace(' ', ''), unicodedata.normalize('NFC', text or ''))
+    return text.lower()
+
+
+def tokens(text):
+    return [t for t in TOKEN_RE.findall(normalize(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+def skill_specialties(skills):
+    words = TOKEN_RE.findall(normalize(skills))
+    found = set()
+    for specialty, terms in SPECIALTY_TERMS.items():
+        for term in terms:
+            if any(word == term or (len(term) >= 4 and word.startswith(term)) for word in words):
+                found.add(specialty)
+                break
+    return found
+
+
+class SearchIndex(NamedTuple):
+    version: tuple
+    doctors: dict
+    specialties: dict
+    postings: dict
+
+
+def build_index(doctors):
+    specialties, postings = defaultdict(set), defaultdict(dict)
+    for doctor in doctors:
+        for specialty in skill_specialties(doctor['skills']):
+            specialties[specialty].add(doctor['id'])
+        for token in tokens(doctor['skills']):
+            postings[token][doctor['id']] = TOKEN_WEIGHT
+        for token in tokens(doctor['name']):
+            postings[token][doctor['id']] = NAME_WEIGHT
+    return dict(specialties), dict(postings)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def search_index():
+    global _index
+    directory = doctor_directory()
+    version = (directory.version, directory.etag)
+    current = _index
+    if current is None or current.version != version:
+        with _index_lock:
+            specialties, postings = build_index(directory.doctors)
+            _index = current = SearchIndex(version, {d['id']: d for d in directory.doctors}, specialties, postings)
+    return current
+
+
+def query_specialties(query):
+    found = []
+    for match in SYMPTOM_RE.finditer(normalize(query)):
+        for specialty in SYMPTOMS[SYMPTOM_KEYS[match.lastindex - 1]]:
+            if specialty not in found:
+                found.append(specialty)
+    return found
+
+
+def find_doctors(query, limit=3, index=None):
+    """Top `limit` doctors for a symptom, specialty or name query.
+
+    Returns (specialties the query mapped to, [{doctor fields..., 'score',
+    'matched'}]) best first; no results when nothing in the query matched.
+    """
+    index = index or search_index()
+    specialties = query_specialties(query)
+    scores, matched = defaultdict(float), defaultdict(list)
+    # Earlier specialties in the query weigh a little more
+    for rank, specialty in enumerate(specialties):
+        for doctor_id in index.specialties.get(specialty, ()):
+            scores[doctor_id] += SPECIALTY_WEIGHT - rank * 0.1
+            matched[doctor_id].append(specialty)
+    for token in set(tokens(query)):
+        for doctor_id, weight in index.postings.get(token, {}).items():
+            scores[doctor_id] += weight
+            matched[doctor_id].append(token)
+
+    best = sorted(scores, key=lambda doctor_id: (-scores[doctor_id], doctor_id))[:limit]
+    return specialties, [
+        {**index.doctors[doctor_id], 'score': round(scores[doctor_id], 2), 'matched': matched[doctor_id]}
+        for doctor_id in best
+    ]
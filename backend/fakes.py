@@ -0,0 +1,178 @@
+"""Offline stand-ins for Gemini chat, Google speech recognition and Gemini TTS.
+
+Enabled with FAKE_BACKENDS=1 (see agent/model.py, speech.py and tts.py) so the
+full request path can run, and be benchmarked, without network access.
+Latency of each fake is configurable to model the real services.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+
+import speech_recognition as sr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+FAKE_BACKENDS = os.getenv('FAKE_BACKENDS', '').lower() in ('1', 'true', 'yes')
+FAKE_LLM_LATENCY = float(os.getenv('FAKE_LLM_LATENCY', 0))
+FAKE_STT_LATENCY = float(os.getenv('FAKE_STT_LATENCY', 0))
+FAKE_TTS_LATENCY = float(os.getenv('FAKE_TTS_LATENCY', 0))
+
+
+def _user_id(messages):
+    for message in messages:
+        match = re.search(r'user_id:\s*(\S+)', str(message.content))
+        if match:
+            return match.group(1)
+    return '1'
+
+
+def _fill(value, user_id):
+    if isinstance(value, str):
+        return value.replace('{user_id}', user_id)
+    if isinstance(value, dict):
+        return {k: _fill(v, user_id) for k, v in value.items()}
+    return value
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from a script instead of an LLM.
+
+    `script` maps a user utterance to the steps the model takes for that turn;
+    each step is either {"tool_calls": [{"name": ..., "args": {...}}]} or
+    {"content": "..."}. The step is picked by counting AI messages after the
+    last human message, so concurrent conversations don't interfere. String
+    args may use {user_id}. Unscripted turns fall back to simple keyword rules.
+    """
+
+    script: dict = Field(default_factory=dict)
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return 'scripted'
+
+    @classmethod
+    def from_env(cls):
+        script = {}
+        if path := os.getenv('FAKE_CHAT_SCRIPT'):
+            with open(path, encoding='utf-8') as f:
+                script = json.load(f)
+        return cls(script=script, latency=FAKE_LLM_LATENCY)
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _default_steps(self, text):
+        text = text.lower()
+        if 'yyyy-mm-dd' in text:
+            # calculate_date's LLM fallback prompt
+            return [{'content': (date.today() + timedelta(days=7)).isoformat()}]
+        if 'doctor' in text or 'ডাক্তার' in text:
+            return [{'tool_calls': [{'name': 'doctor_list', 'args': {}}]}]
+        if 'appointment' in text or 'অ্যাপয়েন্টমেন্ট' in text:
+            return [{'tool_calls': [{'name': 'get_appointment_list', 'args': {'user_id': '{user_id}'}}]}]
+        return [{'content': f'You said: {text}'}]
+
+    def _next_message(self, messages):
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        text = str(messages[last_human].content) if messages else ''
+        step_index = sum(1 for m in messages[last_human:] if isinstance(m, AIMessage))
+        steps = self.script.get(text) or self._default_steps(text)
+        if step_index < len(steps):
+            step = steps[step_index]
+        else:
+            result = next((m for m in reversed(messages) if isinstance(m, ToolMessage)), None)
+            step = {'content': f'Here is what I found: {str(result.content)[:200]}' if result else 'Done.'}
+
+        user_id = _user_id(messages)
+        tool_calls = [
+            {'name': call['name'], 'args': _fill(call.get('args', {}), user_id), 'id': f'call_{step_index}_{i}'}
+            for i, call in enumerate(step.get('tool_calls', []))
+        ]
+        return AIMessage(content=step.get('content', ''), tool_calls=tool_calls)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    # The async paths sleep on the event loop instead of blocking it, like a
+    # real network call would
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    @staticmethod
+    def _chunks(message):
+        for word in re.findall(r'\S+\s*', message.content):
+            yield word, ChatGenerationChunk(message=AIMessageChunk(content=word))
+        if message.tool_calls:
+            yield None, ChatGenerationChunk(message=AIMessageChunk(content='', tool_call_chunks=[
+                tool_call_chunk(name=call['name'], args=json.dumps(call['args']), id=call['id'], index=i)
+                for i, call in enumerate(message.tool_calls)
+            ]))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for word, chunk in self._chunks(self._next_message(messages)):
+            if run_manager and word:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for word, chunk in self._chunks(self._next_message(messages)):
+            if run_manager and word:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+
+# Speech recognition
+
+_transcript = threading.local()
+DEFAULT_TRANSCRIPT = 'show my appointments'
+
+
+def set_transcript(text):
+    """Text the canned recognizer returns for requests on this thread"""
+    _transcript.text = text
+
+
+class CannedRecognizer(sr.Recognizer):
+    """Recognizer whose Google call returns a canned transcript"""
+
+    def recognize_google(self, audio_data, key=None, language='en-US', pfilter=0, show_all=False, with_confidence=False):
+        time.sleep(FAKE_STT_LATENCY)
+        text = getattr(_transcript, 'text', DEFAULT_TRANSCRIPT)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+# Text to speech
+
+def fake_pcm(text, rate=24000, seconds_per_char=0.06, max_seconds=30):
+    """16-bit mono PCM tone roughly as long as the spoken text would be"""
+    period = [int(8000 * math.sin(2 * math.pi * 220 * i / rate)) for i in range(rate // 220)]
+    samples = int(min(len(text) * seconds_per_char, max_seconds) * rate)
+    pcm = array('h', period * (samples // len(period) + 1))[:samples]
+    return pcm.tobytes()
+
+
+def fake_synthesize(text):
+    time.sleep(FAKE_TTS_LATENCY)
+    return fake_pcm(text)
+
+
+async def afake_synthesize(text):
+    await asyncio.sleep(FAKE_TTS_LATENCY)
+    return fake_pcm(text)
@@ -2,7 +2,10 @@ from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from json_provider import FastJSONProvider
+
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
@@ -10,7 +10,16 @@ backlog = 2048
 
 # Worker Processes
 workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"  # Use 'gevent' or 'eventlet' for async if needed
+# SERVING_MODE=async runs asgi:app on uvicorn workers: chat and voice requests
+# wait on Gemini without holding a process, so fewer workers are needed.
+SERVING_MODE = os.getenv("SERVING_MODE", "sync")
+if SERVING_MODE == "async":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() + 1))
+else:
+    wsgi_app = "app:app"
+    worker_class = "sync"  # Use 'gevent' or 'eventlet' for async if needed
 worker_connections = 1000
 max_requests = 1000  # Restart workers after this many requests (prevents memory leaks)
 max_requests_jitter = 50  # Add randomness to max_requests to prevent all workers restarting simultaneously
@@ -47,7 +56,7 @@ def on_reload(server):
 def when_ready(server):
     """Called just after the server is started."""
     print(f"✅ Server is ready. Listening on {bind}")
-    print(f"👷 Running with {workers} workers")
+    print(f"👷 Running with {workers} {SERVING_MODE} workers")
     
 
 def worker_int(worker):
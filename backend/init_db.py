@@ -1,12 +1,14 @@
 from models import Doctor
 from flask_app import app
 from db import db
+from migrations import migrate
 
 # Initialize database and add sample data
 def init_db():
     """Initialize database and add sample doctors"""
     with app.app_context():
         db.create_all()
+        migrate()
         
         # Add sample doctors if they don't exist
         if Doctor.query.count() == 0:
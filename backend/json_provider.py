@@ -0,0 +1,71 @@
+"""Flask JSON provider backed by orjson, with the standard provider as fallback.
+
+orjson encodes straight to UTF-8 bytes (Bengali text is not \\u-escaped) and
+handles dates natively. Datetimes are written as ISO 8601 by default; set
+JSON_DATETIME_FORMAT=http for Flask's old RFC 822 strings. Payloads orjson
+can't encode (e.g. integers beyond 64 bits) go through the standard provider.
+"""
+import os
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+JSON_DATETIME_FORMAT = os.getenv('JSON_DATETIME_FORMAT', 'iso')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    ensure_ascii = False
+
+    def _options(self, sort_keys):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if JSON_DATETIME_FORMAT == 'http':
+            options |= orjson.OPT_PASSTHROUGH_DATETIME
+        return options
+
+    @staticmethod
+    def default(o):
+        # Also used by the fallback encoder, so both paths format dates alike
+        if JSON_DATETIME_FORMAT != 'http' and isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _dumps_bytes(self, obj, sort_keys, indent=False):
+        options = self._options(sort_keys)
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs):
+        # Only plain calls take the fast path; any json.dumps tuning goes to the standard encoder
+        if orjson is not None and set(kwargs) <= {'sort_keys'}:
+            try:
+                return self._dumps_bytes(obj, kwargs.get('sort_keys', self.sort_keys)).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        try:
+            body = self._dumps_bytes(obj, self.sort_keys, indent) + b'\n'
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,88 @@
+"""Versioned schema migrations for databases created before a model change.
+
+db.create_all() only creates missing tables, so columns and indexes added to
+existing tables are applied here. Each migration runs once, in order, in its
+own transaction, and is recorded in the schema_version table. Migrations must
+be idempotent since a fresh database already has the current schema.
+
+Add a migration by appending (version, description, function) to MIGRATIONS.
+"""
+from sqlalchemy import inspect, text
+
+from db import db
+from models import Appointment, DataVersion
+
+
+def _index(table, name):
+    return next(index for index in table.indexes if index.name == name)
+
+
+def add_appointment_indexes(connection):
+    for name in ('ix_appointment_user_active', 'ix_appointment_doctor_date'):
+        _index(Appointment.__table__, name).create(connection, checkfirst=True)
+
+
+def widen_password_hash(connection):
+    # werkzeug's scrypt hashes are 162 characters; SQLite never enforced the
+    # old VARCHAR(120) but server databases do
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(text('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(256)'))
+    elif dialect in ('mysql', 'mariadb'):
+        connection.execute(text('ALTER TABLE `user` MODIFY password_hash VARCHAR(256) NOT NULL'))
+
+
+def add_doctor_version(connection):
+    # The row bump_doctor_version increments; the table itself comes from create_all
+    DataVersion.__table__.create(connection, checkfirst=True)
+    if connection.execute(text("SELECT 1 FROM data_version WHERE name = 'doctors'")).first() is None:
+        connection.execute(text("INSERT INTO data_version (name, version) VALUES ('doctors', 1)"))
+
+
+def add_appointment_date_index(connection):
+    _index(Appointment.__table__, 'ix_appointment_date').create(connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, 'appointment hot-path indexes', add_appointment_indexes),
+    (2, 'widen user.password_hash', widen_password_hash),
+    (3, 'doctor directory version stamp', add_doctor_version),
+    (4, 'appointment date index for archival', add_appointment_date_index),
+]
+
+
+def current_version(connection):
+    if not inspect(connection).has_table('schema_version'):
+        return 0
+    return connection.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+def migrate(engine=None):
+    """Apply pending migrations; returns the versions applied"""
+    engine = engine or db.engine
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_version '
+            '(version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+        ))
+
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        try:
+            with engine.begin() as connection:
+                if version <= current_version(connection):
+                    continue
+                upgrade(connection)
+                connection.execute(
+                    text('INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, CURRENT_TIMESTAMP)'),
+                    {'v': version, 'd': description},
+                )
+        except Exception:
+            # Gunicorn workers start together; another one may have won the race
+            with engine.connect() as connection:
+                if version <= current_version(connection):
+                    continue
+            raise
+        print(f"✅ Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
@@ -1,11 +1,14 @@
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
 from db import db
+from schedule import compile_schedule
 # Models
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     appointments = db.relationship('Appointment', backref='user', lazy=True)
 
     def set_password(self, password):
@@ -21,6 +24,17 @@ class Doctor(db.Model):
     skills = db.Column(db.String(220), nullable=False)
     appointments = db.relationship('Appointment', backref='doctor', lazy=True)
 
+    @property
+    def schedule(self):
+        """Compiled weekday mask and hours for `availability`"""
+        return compile_schedule(self.availability)
+
+@event.listens_for(Doctor.availability, 'set')
+def compile_availability(target, value, oldvalue, initiator):
+    # Parse new or changed availability once, up front, instead of per lookup
+    if value:
+        compile_schedule(value)
+
 class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, nullable=False)
@@ -31,3 +45,51 @@ class Appointment(db.Model):
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
 
+    # Hot paths only look at active rows; where partial indexes aren't
+    # supported these are plain indexes. Applied to existing databases by
+    # migrations.py.
+    __table_args__ = (
+        # A user's appointments (GET /appointments, get_user_appointments)
+        db.Index('ix_appointment_user_active', 'user_id', 'date',
+                 sqlite_where=db.text('is_deleted = 0'), postgresql_where=db.text('NOT is_deleted')),
+        # A doctor's day: duplicate check, serial seed, availability counts
+        db.Index('ix_appointment_doctor_date', 'doctor_id', 'date', 'is_deleted'),
+        # Oldest rows first for the archival job
+        db.Index('ix_appointment_date', 'date'),
+    )
+
+class AppointmentArchive(db.Model):
+    """Cancelled and long-past appointments moved out of the live table by
+    archive.py, keeping their original ids"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.DateTime, nullable=False)
+    patient_name = db.Column(db.String(80), nullable=False)
+    patient_age = db.Column(db.Integer, nullable=False)
+    serial_number = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    is_deleted = db.Column(db.Boolean, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_appointment_archive_user_date', 'user_id', 'date'),
+    )
+
+class AppointmentCounter(db.Model):
+    """Last serial number handed out per doctor per day"""
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    last_serial = db.Column(db.Integer, nullable=False)
+
+class DataVersion(db.Model):
+    """Version stamps that let each worker know when its cached copy of a
+    table is stale"""
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+@event.listens_for(Session, 'before_flush')
+def bump_doctor_version(session, flush_context, instances):
+    # Any doctor insert, change or delete invalidates every worker's directory,
+    # in the same transaction as the change itself
+    if any(isinstance(obj, Doctor) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.execute(update(DataVersion).where(DataVersion.name == 'doctors').values(version=DataVersion.version + 1))
@@ -1,4 +1,4 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify, send_file, Response, stream_with_context, url_for
 
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, create_refresh_token, get_jwt_identity, get_jwt
 
@@ -7,17 +7,23 @@ import speech_recognition as sr
 import os
 import uuid
 
-from pydub import AudioSegment
-
 from datetime import datetime, timedelta
 from db import db
 from models import User, Doctor, Appointment
-from tts import gen_audio_file
-from service import book_appointment
+from speech import AudioDecodeError, speech_stats, speech_to_text
+from tts_cache import tts_cache
+from tts import AUDIO_FORMATS, TTS_AUDIO_FORMAT
+from tts_jobs import audio_error, audio_file, audio_status, remove_audio, submit_tts, tts_job_stats, wait_seconds
+from service import (
+    APPOINTMENT_PAGE_SIZE, MAX_APPOINTMENT_PAGE_SIZE, MAX_BULK_APPOINTMENTS, book_appointment,
+    book_appointments_bulk, doctor_directory, get_doctor_availability, list_appointment_history,
+    list_user_appointments,
+)
+from doctor_search import find_doctors
 
 from flask_app import app
 
-from agent.app import run_chatbot
+from agent.app import run_chatbot, stream_chatbot, conversation_store_stats
 
 # Create directories for temporary files
 os.makedirs('temp_audio', exist_ok=True)
@@ -43,7 +49,6 @@ LANGUAGE_CONFIG = {
 @app.route('/process-audio', methods=['POST'])
 @jwt_required()
 def process_audio():
-    temp_input_path = None
     try:
         
         if 'audio' not in request.files:
@@ -58,43 +63,10 @@ def process_audio():
         lang_config = LANGUAGE_CONFIG[language]
         print(f"Processing audio in {lang_config['name']} language")
 
-        unique_id = str(uuid.uuid4())
-        temp_input_path = f'temp_audio/input_{unique_id}.wav'
-        
-        # Convert and save uploaded audio file to WAV format
-        try:
-            audio_file.save(temp_input_path)
-
-            try:
-                with sr.AudioFile(temp_input_path) as test_source:
-                    pass  # Just test if readable
-                print("Audio file is compatible, no conversion needed")
-            except:
-                print("Attempting audio format conversion...")
-                audio_file.seek(0)
-                audio_segment = AudioSegment.from_file(audio_file)
-                audio_segment = audio_segment.set_frame_rate(16000).set_channels(1)
-                audio_segment.export(temp_input_path, format='wav')
-                print("Audio converted successfully")
-
-        except Exception as e:
-            try:
-                audio_file.seek(0)
-                audio_file.save(temp_input_path)
-                print(f"Audio conversion failed, trying direct processing: {str(e)}")
-            except Exception as e2:
-                return jsonify({'error': f'Audio processing failed: {str(e)} | Fallback failed: {str(e2)}'}), 400
-
-        # Create a NEW recognizer per request to avoid shared state
-        local_recognizer = sr.Recognizer()
-
-        with sr.AudioFile(temp_input_path) as source:
-            local_recognizer.adjust_for_ambient_noise(source)
-            audio_data = local_recognizer.record(source)
-
         try:
-            user_text = local_recognizer.recognize_google(audio_data, language=lang_config['speech_code'])
-            print(f"User text: {user_text}")
+            user_text = speech_to_text(audio_file.stream, lang_config['speech_code'])
+        except AudioDecodeError as e:
+            return jsonify({'error': f'Unsupported audio: {str(e)}'}), 400
         except sr.UnknownValueError:
             return jsonify({'error': 'Could not understand audio'}), 400
         except sr.RequestError as e:
@@ -113,20 +85,17 @@ def process_audio():
         print(f"Error processing audio: {str(e)}")
         return jsonify({'error': f'Processing error: {str(e)}'}), 500
 
-    finally:
-        # Cleanup input file on any failure
-        if temp_input_path and os.path.exists(temp_input_path):
-            try:
-                os.remove(temp_input_path)
-            except:
-                pass
+def speech_response_text(llm_response, language):
+    """Long answers are shown on screen; only a short prompt is spoken"""
+    speech_text = llm_response
+    if len(llm_response) > 500:
+        speech_text = 'Read the following text carefully and response accordingly:' if language=='en' else 'নিচের লেখাটি মনোযোগ সহকারে পড়ুন এবং সেই অনুযায়ী উত্তর দিন'
+        llm_response = f'## {speech_text}\n{llm_response}'
+    return llm_response, speech_text
 
 @app.route('/web/process-audio', methods=['POST'])
 @jwt_required()
 def process_audio_web():
-    temp_input_path = None
-    temp_output_path = None
-
     try:
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
@@ -141,43 +110,11 @@ def process_audio_web():
         print(f"Processing audio in {lang_config['name']} language")
 
         unique_id = str(uuid.uuid4())
-        temp_input_path = f'temp_audio/input_{unique_id}.wav'
-        temp_output_path = f'temp_audio/output_{unique_id}.wav'
-
-        # Convert and save uploaded audio file to WAV format
-        try:
-            audio_file.save(temp_input_path)
-
-            try:
-                with sr.AudioFile(temp_input_path) as test_source:
-                    pass  # Just test if readable
-                print("Audio file is compatible, no conversion needed")
-            except:
-                print("Attempting audio format conversion...")
-                audio_file.seek(0)
-                audio_segment = AudioSegment.from_file(audio_file)
-                audio_segment = audio_segment.set_frame_rate(16000).set_channels(1)
-                audio_segment.export(temp_input_path, format='wav')
-                print("Audio converted successfully")
-
-        except Exception as e:
-            try:
-                audio_file.seek(0)
-                audio_file.save(temp_input_path)
-                print(f"Audio conversion failed, trying direct processing: {str(e)}")
-            except Exception as e2:
-                return jsonify({'error': f'Audio processing failed: {str(e)} | Fallback failed: {str(e2)}'}), 400
-
-        # Create a NEW recognizer per request to avoid shared state
-        local_recognizer = sr.Recognizer()
-
-        with sr.AudioFile(temp_input_path) as source:
-            local_recognizer.adjust_for_ambient_noise(source)
-            audio_data = local_recognizer.record(source)
 
         try:
-            user_text = local_recognizer.recognize_google(audio_data, language=lang_config['speech_code'])
-            print(f"User text: {user_text}")
+            user_text = speech_to_text(audio_file.stream, lang_config['speech_code'])
+        except AudioDecodeError as e:
+            return jsonify({'error': f'Unsupported audio: {str(e)}'}), 400
         except sr.UnknownValueError:
             return jsonify({'error': 'Could not understand audio'}), 400
         except sr.RequestError as e:
@@ -185,34 +122,21 @@ def process_audio_web():
 
         user_id_str = get_jwt_identity()
         llm_response = run_chatbot(user_text, user_id_str)
-        speech_text = llm_response
-        if len(llm_response) > 500:
-            speech_text = 'Read the following text carefully and response accordingly:' if language=='en' else 'নিচের লেখাটি মনোযোগ সহকারে পড়ুন এবং সেই অনুযায়ী উত্তর দিন'
-            llm_response = f'## {speech_text}\n{llm_response}'
-        try:
-            gen_audio_file(temp_output_path, speech_text)
-        except Exception as ex:
-            print(ex)
-        
-        
+        llm_response, speech_text = speech_response_text(llm_response, language)
+        # Audio is synthesized in the background; GET /get-audio waits for it
+        queued = submit_tts(unique_id, speech_text)
+
         return jsonify({
             'user_text': user_text,
             'llm_response': llm_response,
-            'audio_id': unique_id,
+            'audio_id': unique_id if queued else None,
+            'audio_status': 'pending' if queued else 'unavailable',
             'error':None
         })
 
     except Exception as e:
         print(f"Error processing audio: {str(e)}")
         return jsonify({'error': f'Processing error: {str(e)}'}), 500
-
-    finally:
-        # Cleanup input file on any failure
-        if temp_input_path and os.path.exists(temp_input_path):
-            try:
-                os.remove(temp_input_path)
-            except:
-                pass
             
 @app.route('/process-text', methods=['POST'])
 @jwt_required()
@@ -234,25 +158,69 @@ def process_text():
         print(f"Error processing audio: {str(e)}")
         return jsonify({'error': f'Processing error: {str(e)}'}), 500
 
+
+@app.route('/process-text/stream', methods=['POST'])
+@jwt_required()
+def process_text_stream():
+    """Streams the agent turn as newline-delimited JSON events"""
+    data = request.get_json()
+    user_text = data.get('user-text')
+    user_id_str = get_jwt_identity()
+
+    def generate():
+        yield app.json.dumps({'type': 'start', 'user_text': user_text}) + '\n'
+        try:
+            for event in stream_chatbot(user_text, user_id_str):
+                yield app.json.dumps(event) + '\n'
+        except Exception as e:
+            print(f"Error streaming text: {str(e)}")
+            yield app.json.dumps({'type': 'error', 'error': f'Processing error: {str(e)}'}) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
     
 
+def negotiate_audio_format():
+    """TTS_AUDIO_FORMAT unless ?format=wav or the Accept header prefers WAV"""
+    if request.args.get('format') in ('wav', TTS_AUDIO_FORMAT):
+        return request.args['format']
+    stored = AUDIO_FORMATS[TTS_AUDIO_FORMAT][1]
+    best = request.accept_mimetypes.best_match([stored, 'audio/wav', 'audio/x-wav', 'audio/wave'], default=stored)
+    return TTS_AUDIO_FORMAT if best == stored else 'wav'
+
 @app.route('/get-audio/<audio_id>', methods=['GET'])
 def get_audio(audio_id):
     try:
-        audio_path = f'temp_audio/output_{audio_id}.wav'
-        if os.path.exists(audio_path):
-            return send_file(audio_path, as_attachment=True, download_name='response.wav', mimetype='audio/wav')
-        else:
-            return jsonify({'error': 'Audio file not found'}), 404
+        try:
+            wait = wait_seconds(request.args.get('wait'))
+        except ValueError:
+            return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+        status = audio_status(audio_id, wait)
+        if status == 'ready':
+            path, mimetype, extension = audio_file(audio_id, negotiate_audio_format())
+            # conditional=True answers Range requests with 206, so playback can start early
+            response = send_file(path, as_attachment=True, download_name=f'response.{extension}',
+                                 mimetype=mimetype, conditional=True)
+            response.headers['Vary'] = 'Accept'
+            return response
+        if status == 'pending':
+            response = jsonify({'status': 'pending', 'audio_id': audio_id})
+            response.headers['Retry-After'] = '1'
+            return response, 202
+        if status == 'failed':
+            return jsonify({'error': f'Audio generation failed: {audio_error(audio_id)}'}), 500
+        return jsonify({'error': 'Audio file not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Error retrieving audio: {str(e)}'}), 500
 
 @app.route('/cleanup/<audio_id>', methods=['DELETE'])
 def cleanup_audio(audio_id):
     try:
-        audio_path = f'temp_audio/output_{audio_id}.wav'
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+        remove_audio(audio_id)
         return jsonify({'message': 'File cleaned up successfully'})
     except Exception as e:
         return jsonify({'error': f'Cleanup error: {str(e)}'}), 500
@@ -262,13 +230,64 @@ def cleanup_audio(audio_id):
 @app.route('/doctors', methods=['GET'])
 def get_doctors():
     try:
-        doctors = Doctor.query.all()
-        return jsonify([{
-            'id': doctor.id,
-            'name': doctor.name,
-            'specialization': doctor.skills,
-            'availability': doctor.availability
-        } for doctor in doctors])
+        directory = doctor_directory()
+        # Clients holding the current list get an empty 304
+        if directory.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = jsonify([{
+                'id': doctor['id'],
+                'name': doctor['name'],
+                'specialization': doctor['skills'],
+                'availability': doctor['availability']
+            } for doctor in directory.doctors])
+        response.set_etag(directory.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/doctors/search', methods=['GET'])
+def search_doctors():
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 3)), 1), 20)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+
+        specialties, doctors = find_doctors(query, limit)
+        return jsonify({
+            'query': query,
+            'specialties': specialties,
+            'results': [{
+                'id': doctor['id'],
+                'name': doctor['name'],
+                'specialization': doctor['skills'],
+                'availability': doctor['availability'],
+                'score': doctor['score'],
+                'matched': doctor['matched']
+            } for doctor in doctors]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/doctors/<int:doctor_id>/availability', methods=['GET'])
+def get_doctor_availability_route(doctor_id):
+    try:
+        start = request.args.get('from')
+        try:
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            days = int(request.args.get('days', 14))
+        except ValueError:
+            return jsonify({'error': 'Use from=YYYY-MM-DD and an integer days'}), 400
+
+        availability = get_doctor_availability([doctor_id], start, days)
+        if not availability:
+            return jsonify({'error': 'Doctor not found'}), 404
+        return jsonify(availability[0])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -283,13 +302,15 @@ def add_doctor():
         if not name or not availability:
             return jsonify({'error': 'Name and availability are required'}), 400
         
-        doctor = Doctor(name=name, availability=availability)
+        # Committing bumps the directory version, so every worker reloads it
+        doctor = Doctor(name=name, availability=availability, skills=data.get('skills', ''))
         db.session.add(doctor)
         db.session.commit()
         
         return jsonify({
             'id': doctor.id,
             'name': doctor.name,
+            'skills': doctor.skills,
             'availability': doctor.availability
         }), 201
     except Exception as e:
@@ -342,27 +363,86 @@ def add_appointment():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/appointments/bulk', methods=['POST'])
+@jwt_required()
+def add_appointments_bulk():
+    try:
+        user_id_str = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+        bookings = data.get('appointments')
+        if not isinstance(bookings, list) or not bookings:
+            return jsonify({'error': 'appointments must be a non-empty list'}), 400
+        if len(bookings) > MAX_BULK_APPOINTMENTS:
+            return jsonify({'error': f'At most {MAX_BULK_APPOINTMENTS} appointments per request'}), 413
+        print(f"Bulk booking of {len(bookings)} appointments from user {user_id_str}")
+
+        results = book_appointments_bulk(user_id_str, bookings)
+        created = sum(1 for result in results if 'error' not in result)
+        return jsonify({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        }), 201 if created else 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/appointments', methods=['GET'])
 @jwt_required()
 def get_user_appointments():
     try:
         user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)  # Convert string back to int for database
-        appointments = db.session.query(Appointment, Doctor).join(
-            Doctor, Appointment.doctor_id == Doctor.id
-        ).filter(
-            Appointment.user_id == user_id,
-            Appointment.is_deleted == False
-        ).all()
-
-        return jsonify([{
-            'id': appointment.id,
-            'doctor_name': doctor.name,
-            'availability':doctor.availability,
-            'date': appointment.date,
-            'patient_name':appointment.patient_name,
-            'serial_number':appointment.serial_number
-        } for appointment, doctor in appointments])
+        try:
+            # Without limit or cursor the whole list is returned, as existing clients expect
+            limit = None
+            if 'limit' in request.args or 'cursor' in request.args:
+                limit = min(int(request.args.get('limit', APPOINTMENT_PAGE_SIZE)), MAX_APPOINTMENT_PAGE_SIZE)
+                limit = max(limit, 1)
+            rows, next_cursor = list_user_appointments(
+                user_id_str, request.args.get('when', 'all'), limit, request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = jsonify([{
+            'id': row.id,
+            'doctor_name': row.doctor_name,
+            'availability':row.availability,
+            'date': row.date,
+            'patient_name':row.patient_name,
+            'serial_number':row.serial_number
+        } for row in rows])
+        # The body stays a plain list; the next page is announced in headers
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for(request.endpoint, **{**request.args, "cursor": next_cursor})}>; rel="next"'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/appointments/history', methods=['GET'])
+@jwt_required()
+def get_appointment_history():
+    try:
+        user_id_str = get_jwt_identity()
+        try:
+            limit = min(int(request.args.get('limit', APPOINTMENT_PAGE_SIZE)), MAX_APPOINTMENT_PAGE_SIZE)
+            rows, next_cursor = list_appointment_history(user_id_str, max(limit, 1), request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = jsonify([{
+            'id': row.id,
+            'doctor_name': row.doctor_name,
+            'availability':row.availability,
+            'date': row.date,
+            'patient_name':row.patient_name,
+            'serial_number':row.serial_number,
+            'status': 'cancelled' if row.is_deleted else 'completed'
+        } for row in rows])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for(request.endpoint, **{**request.args, "cursor": next_cursor})}>; rel="next"'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -387,6 +467,24 @@ def cancel_appointment(appointment_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stats/conversations', methods=['GET'])
+@jwt_required()
+def get_conversation_stats():
+    try:
+        return jsonify(conversation_store_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stats/speech', methods=['GET'])
+@jwt_required()
+def get_speech_stats():
+    """This worker's clip counts, the seconds of silence trimmed before
+    recognition and its background TTS jobs"""
+    stats = {key: round(value, 2) for key, value in speech_stats.items()}
+    stats['tts'] = tts_job_stats()
+    stats['tts_cache'] = tts_cache.report() if tts_cache else None
+    return jsonify(stats)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'Speech-to-text and appointment booking service is running'})
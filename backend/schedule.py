@@ -0,0 +1,163 @@
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+ALL_DAYS = 0b1111111
+FULL_DAY = ((0, 24 * 60),)
+
+DAY_NAMES = {
+    'mon': 0, 'monday': 0, 'সোম': 0, 'সোমবার': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1, 'মঙ্গল': 1, 'মঙ্গলবার': 1,
+    'wed': 2, 'weds': 2, 'wednesday': 2, 'বুধ': 2, 'বুধবার': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3, 'বৃহস্পতি': 3, 'বৃহস্পতিবার': 3,
+    'fri': 4, 'friday': 4, 'শুক্র': 4, 'শুক্রবার': 4,
+    'sat': 5, 'saturday': 5, 'শনি': 5, 'শনিবার': 5,
+    'sun': 6, 'sunday': 6, 'রবি': 6, 'রবিবার': 6,
+}
+EVERY_DAY = {'daily', 'everyday', 'every day', 'all days', 'প্রতিদিন'}
+
+DAY = '|'.join(sorted(map(re.escape, DAY_NAMES), key=len, reverse=True))
+TIME = r'(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?'
+TIME_RANGE_RE = re.compile(rf'{TIME}\s*(?:-|–|to)\s*{TIME}', re.IGNORECASE)
+DAY_RANGE_RE = re.compile(rf'({DAY})\s*(?:-|–|to)\s*({DAY})(?![a-z])', re.IGNORECASE)
+DAY_RE = re.compile(rf'({DAY})(?![a-z])', re.IGNORECASE)
+
+
+class Schedule(NamedTuple):
+    """A doctor's availability compiled from the free-text `Doctor.availability`.
+
+    `mask` has bit n set when the doctor works on weekday n (Mon=0), and
+    `windows[n]` holds that day's (start, end) minutes after midnight. A
+    window past midnight ('Fri 10PM-2AM') is split, the early hours going to
+    the next day's windows.
+    `known` is False when the text could not be parsed; such a schedule
+    accepts every day so bookings are not blocked by a typo.
+    """
+    mask: int
+    windows: tuple
+    known: bool = True
+
+    def works_on(self, day):
+        return bool(self.mask >> day.weekday() & 1)
+
+    def accepts(self, when):
+        """Date check, or an hours check when `when` carries a time of day"""
+        if not isinstance(when, datetime) or (when.hour, when.minute) == (0, 0):
+            return self.works_on(when)
+        minute = when.hour * 60 + when.minute
+        return any(start <= minute < end for start, end in self.windows[when.weekday()])
+
+    def next_available_days(self, start=None, count=1, horizon=366):
+        """The next `count` working days from `start` (inclusive)"""
+        day = start or date.today()
+        if isinstance(day, datetime):
+            day = day.date()
+        found = []
+        for offset in range(horizon):
+            if len(found) == count:
+                break
+            current = day + timedelta(days=offset)
+            if self.mask >> current.weekday() & 1:
+                found.append(current)
+        return found
+
+    def describe(self):
+        days = [WEEKDAYS[i] for i in range(7) if self.mask >> i & 1]
+        return ', '.join(days) if self.known else 'unknown'
+
+
+def _minutes(hour, minute, meridiem, default_meridiem=None):
+    hour, minute = int(hour), int(minute or 0)
+    meridiem = (meridiem or default_meridiem or '').lower().replace('.', '')
+    if meridiem == 'pm' and hour < 12:
+        hour += 12
+    elif meridiem == 'am' and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+def _parse_segment(segment):
+    windows = []
+    for match in TIME_RANGE_RE.finditer(segment):
+        h1, m1, ap1, h2, m2, ap2 = match.groups()
+        start = _minutes(h1, m1, ap1, ap2 if not ap1 and ap2 and int(h1) <= int(h2) else None)
+        end = _minutes(h2, m2, ap2)
+        if end <= start:
+            end += 12 * 60 if not ap2 and end + 12 * 60 > start else 0
+        # end < start is a window past midnight, split by compile_schedule
+        windows.append((start, min(end, 24 * 60)))
+    days_text = TIME_RANGE_RE.sub(' ', segment)
+
+    mask = 0
+    if any(word in days_text.lower() for word in EVERY_DAY):
+        mask = ALL_DAYS
+    for first, last in DAY_RANGE_RE.findall(days_text):
+        a, b = DAY_NAMES[first.lower()], DAY_NAMES[last.lower()]
+        for i in range(7):
+            if (a <= b and a <= i <= b) or (a > b and (i >= a or i <= b)):
+                mask |= 1 << i
+    for name in DAY_RE.findall(DAY_RANGE_RE.sub(' ', days_text)):
+        mask |= 1 << DAY_NAMES[name.lower()]
+    return mask, tuple(windows) or FULL_DAY
+
+
+def _day_groups(availability):
+    """Split on ';', '|' and newlines, and on a comma that follows a time range
+    ('Mon-Fri 9AM-5PM, Sat 10AM-1PM') but not one inside a list of days
+    ('Mon, Wed, Fri 8AM-4PM')"""
+    for segment in re.split(r'[;|\n]', availability or ''):
+        group = ''
+        for part in segment.split(','):
+            if TIME_RANGE_RE.search(group):
+                yield group
+                group = part
+            else:
+                group = f'{group},{part}' if group else part
+        yield group
+
+
+@lru_cache(maxsize=1024)
+def compile_schedule(availability):
+    """Parse an availability string such as 'Mon-Fri 9AM-5PM',
+    'Mon, Wed, Fri 8AM-4PM', 'Mon-Fri 9AM-5PM, Sat 10AM-1PM' or
+    'Mon-Wed, Fri 9AM-1PM; Sat 10PM-2AM'. Results are cached per distinct string."""
+    day_windows = [() for _ in range(7)]
+    mask = group_mask = 0
+    for group in _day_groups(availability):
+        segment_mask, windows = _parse_segment(group)
+        if not segment_mask and windows is not FULL_DAY:
+            # More hours for the previous days: 'Mon 9AM-12PM, 2PM-5PM'
+            segment_mask = group_mask
+        mask |= segment_mask
+        group_mask = segment_mask
+        for i in range(7):
+            if segment_mask >> i & 1:
+                for start, end in windows:
+                    if start < end:
+                        day_windows[i] += ((start, end),)
+                    else:
+                        day_windows[i] += ((start, 24 * 60),)
+                        day_windows[(i + 1) % 7] += ((0, end),)
+    if not mask:
+        print(f"Could not parse doctor availability: {availability!r}")
+        return Schedule(ALL_DAYS, (FULL_DAY,) * 7, known=False)
+    return Schedule(mask, tuple(day_windows))
+
+
+def working_day_matrix(masks, start, days):
+    """Vectorized weekday check for many schedules over a horizon.
+
+    Returns (dates, works) where `dates` is a datetime64[D] array of `days`
+    dates from `start` and `works[i, j]` is True when the schedule with
+    weekday mask `masks[i]` covers `dates[j]`.
+    """
+    first = np.datetime64(start, 'D')
+    dates = np.arange(first, first + days)
+    # 1970-01-01 was a Thursday, so (epoch days + 3) % 7 gives Mon=0
+    weekdays = (dates.astype(np.int64) + 3) % 7
+    works = (np.asarray(masks, dtype=np.int64)[:, None] >> weekdays[None, :]) & 1
+    return dates, works.astype(bool)
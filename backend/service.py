@@ -1,13 +1,64 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import threading
+from typing import NamedTuple
 from db import db
-from models import Doctor, Appointment, User
+from models import Doctor, Appointment, AppointmentArchive, AppointmentCounter, DataVersion, User
 import dateparser
+import numpy as np
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import and_, func, insert, or_, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from schedule import working_day_matrix
+
+# Appointments a doctor takes per working day
+DAILY_CAPACITY = int(os.getenv('DOCTOR_DAILY_CAPACITY', 20))
+MAX_AVAILABILITY_DAYS = 366
+# Appointment listings are paged; GET /appointments may ask for up to the max
+APPOINTMENT_PAGE_SIZE = int(os.getenv('APPOINTMENT_PAGE_SIZE', 50))
+MAX_APPOINTMENT_PAGE_SIZE = 500
+APPOINTMENT_VIEWS = ('all', 'upcoming', 'past')
+# Rows accepted by one POST /appointments/bulk
+MAX_BULK_APPOINTMENTS = int(os.getenv('MAX_BULK_APPOINTMENTS', 10000))
+
+class DoctorDirectory(NamedTuple):
+    version: int
+    doctors: tuple
+    etag: str
+
+_directory = None
+_directory_lock = threading.Lock()
+
+def doctor_directory():
+    """Process-local snapshot of the doctor table.
+
+    Each call costs one primary-key read of the 'doctors' version stamp, which
+    any doctor insert/change/delete bumps (models.bump_doctor_version); the
+    table is reloaded only when the stamp moved. Without a stamp (migrations
+    not applied) every call reloads.
+    """
+    global _directory
+    version = db.session.query(DataVersion.version).filter_by(name='doctors').scalar() or 0
+    current = _directory
+    if current is not None and version and current.version == version:
+        return current
+    with _directory_lock:
+        rows = db.session.query(Doctor.id, Doctor.name, Doctor.skills, Doctor.availability).order_by(Doctor.id).all()
+        doctors = tuple({'id': id, 'name': name, 'skills': skills, 'availability': availability}
+                        for id, name, skills, availability in rows)
+        etag = hashlib.sha1(json.dumps(doctors, sort_keys=True).encode()).hexdigest()[:20]
+        _directory = DoctorDirectory(version, doctors, etag)
+        return _directory
 
 def get_doctors():
     result=['id, name, skills, availability']
     try:
-        doctors = Doctor.query.all()
-        for doctor in doctors:
-            result.append(f'{doctor.id}, {doctor.name}, {doctor.skills}, {doctor.availability}')
+        for doctor in doctor_directory().doctors:
+            result.append(f"{doctor['id']}, {doctor['name']}, {doctor['skills']}, {doctor['availability']}")
         
     except:
         pass
@@ -15,16 +66,122 @@ def get_doctors():
 
 def get_doctor_list():
     try:
-        doctors = Doctor.query.all()
-        return [{
-            'id': doctor.id,
-            'name': doctor.name,
-            'skills': doctor.skills,
-            'availability': doctor.availability
-        } for doctor in doctors]
+        return [dict(doctor) for doctor in doctor_directory().doctors]
     except Exception as e:
         return []
 
+def get_doctor_availability(doctor_ids=None, start=None, days=14):
+    """Remaining capacity per working day for the given doctors (all by default).
+
+    Weekday masks and booked counts are combined as (doctors x days) arrays,
+    with a single grouped query for the bookings in the horizon.
+    """
+    start = start or date.today()
+    days = max(1, min(int(days), MAX_AVAILABILITY_DAYS))
+    query = Doctor.query.order_by(Doctor.id)
+    if doctor_ids is not None:
+        query = query.filter(Doctor.id.in_(doctor_ids))
+    doctors = query.all()
+    if not doctors:
+        return []
+
+    dates, works = working_day_matrix([doctor.schedule.mask for doctor in doctors], start, days)
+
+    begin = datetime.combine(start, datetime.min.time())
+    bookings = db.session.query(
+        Appointment.doctor_id, Appointment.date, func.count(Appointment.id)
+    ).filter(
+        Appointment.doctor_id.in_([doctor.id for doctor in doctors]),
+        Appointment.date >= begin,
+        Appointment.date < begin + timedelta(days=days),
+        Appointment.is_deleted == False
+    ).group_by(Appointment.doctor_id, Appointment.date).all()
+
+    booked = np.zeros(works.shape, dtype=np.int64)
+    if bookings:
+        row_of = {doctor.id: i for i, doctor in enumerate(doctors)}
+        booked_doctors, booked_dates, counts = zip(*bookings)
+        rows = np.fromiter((row_of[d] for d in booked_doctors), dtype=np.int64, count=len(bookings))
+        cols = (np.array(booked_dates, dtype='datetime64[D]') - dates[0]).astype(np.int64)
+        np.add.at(booked, (rows, cols), counts)
+    remaining = np.where(works, np.maximum(DAILY_CAPACITY - booked, 0), 0)
+
+    labels = dates.astype(str).tolist()
+    result = []
+    for i, doctor in enumerate(doctors):
+        open_days = np.flatnonzero(works[i])
+        result.append({
+            'doctor_id': doctor.id,
+            'doctor_name': doctor.name,
+            'availability': doctor.availability,
+            'capacity': DAILY_CAPACITY,
+            'days': [{
+                'date': labels[j],
+                'booked': int(booked[i, j]),
+                'remaining': int(remaining[i, j]),
+            } for j in open_days],
+        })
+    return result
+
+def allocate_serial(doctor_id, day, count=1):
+    """Next serial number for a doctor's day, inside the caller's transaction.
+    With count > 1 a block of consecutive serials is reserved and the first
+    one is returned.
+
+    The UPDATE takes the counter row's write lock (the database write lock on
+    SQLite), so concurrent bookings in any worker are serialized until commit
+    and never share a serial. The first booking of a day creates the row,
+    seeded from serials that predate the counter.
+    """
+    increment = update(AppointmentCounter).where(
+        AppointmentCounter.doctor_id == doctor_id, AppointmentCounter.day == day
+    ).values(last_serial=AppointmentCounter.last_serial + count)
+
+    if db.session.execute(increment).rowcount == 0:
+        begin = datetime.combine(day, datetime.min.time())
+        existing = max(db.session.query(func.max(table.serial_number)).filter(
+            table.doctor_id == doctor_id,
+            table.date >= begin,
+            table.date < begin + timedelta(days=1)
+        ).scalar() or 0 for table in (Appointment, AppointmentArchive))
+        try:
+            with db.session.begin_nested():
+                db.session.add(AppointmentCounter(doctor_id=doctor_id, day=day, last_serial=existing + count))
+            return existing + 1
+        except IntegrityError:
+            # Another booking created the row first
+            db.session.execute(increment)
+
+    last = db.session.query(AppointmentCounter.last_serial).filter_by(doctor_id=doctor_id, day=day).scalar()
+    return last - count + 1
+
+def booked_count(doctor_id, day):
+    """Active appointments on a doctor's day. Called after allocate_serial,
+    under the counter lock, so bookings racing for the last places are counted
+    one after another."""
+    begin = datetime.combine(day, datetime.min.time())
+    return db.session.query(func.count(Appointment.id)).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date >= begin,
+        Appointment.date < begin + timedelta(days=1),
+        Appointment.is_deleted == False
+    ).scalar()
+
+def release_serials(doctor_id, day, count):
+    """Hand back the last `count` serials reserved by allocate_serial in this transaction"""
+    db.session.execute(update(AppointmentCounter).where(
+        AppointmentCounter.doctor_id == doctor_id, AppointmentCounter.day == day
+    ).values(last_serial=AppointmentCounter.last_serial - count))
+
+def fully_booked_error(doctor, day):
+    return f'{doctor.name} is fully booked on {day.strftime("%a, %B %d, %Y")} ({DAILY_CAPACITY} appointments a day)'
+
+def next_open_days(doctor_id, after, count=3, horizon=60):
+    """Next working days with places left, as in get_doctor_availability"""
+    availability = get_doctor_availability([doctor_id], after, horizon)
+    days = [day['date'] for day in availability[0]['days'] if day['remaining']] if availability else []
+    return [datetime.fromisoformat(day) for day in days[:count]]
+
 def book_appointment(user_id: str, doctor_id: str, patient_name: str, patient_age: int, date: str):
     print("appointment Date:",date)
     try:
@@ -54,7 +211,18 @@ def book_appointment(user_id: str, doctor_id: str, patient_name: str, patient_ag
         doctor = Doctor.query.get(doctor_id)
         if not doctor:
             return {'error': 'Doctor not found'}
-        
+
+        if date_obj is None:
+            return {'error': 'Invalid date format. Please use ISO format (YYYY-MM-DD HH:MM:SS)'}
+
+        # Check the date against the doctor's precompiled schedule
+        if not doctor.schedule.accepts(date_obj):
+            next_days = doctor.schedule.next_available_days(date_obj + timedelta(days=1), 3)
+            return {
+                'error': f'{doctor.name} is not available at that time ({doctor.availability})',
+                'next_available_days': [day.strftime('%a, %B %d, %Y') for day in next_days],
+            }
+
         # Check if user exists (optional)
         user = User.query.get(user_id)
         if not user:
@@ -68,16 +236,21 @@ def book_appointment(user_id: str, doctor_id: str, patient_name: str, patient_ag
         if existing_appointment:
             return {'error': 'Already booked by you'}
         
-        # Get serial number more safely (excluding soft-deleted appointments)
-        serial_count = Appointment.query.filter_by(
-            doctor_id=doctor_id, date=date_obj, is_deleted=False
-        ).count()
-        
+        # Serial numbers come from an atomic per-(doctor, day) counter
+        serial_number = allocate_serial(doctor_id, date_obj.date())
+        if booked_count(doctor_id, date_obj.date()) >= DAILY_CAPACITY:
+            db.session.rollback()
+            next_days = next_open_days(doctor_id, date_obj.date() + timedelta(days=1))
+            return {
+                'error': fully_booked_error(doctor, date_obj),
+                'next_available_days': [day.strftime('%a, %B %d, %Y') for day in next_days],
+            }
+
         appointment = Appointment(
             date=date_obj,
             patient_name=patient_name.strip(),
             patient_age=patient_age,
-            serial_number=serial_count + 1,
+            serial_number=serial_number,
             user_id=user_id,
             doctor_id=doctor_id
         )
@@ -101,23 +274,227 @@ def book_appointment(user_id: str, doctor_id: str, patient_name: str, patient_ag
         return {'error': str(e)}
 
 
-def get_user_appointments(user_id: str):
+def parse_booking_date(value):
+    """ISO dates are parsed directly; anything else goes through dateparser.
+
+    A UTC offset is dropped, keeping the wall-clock time as written: the
+    date column is naive, and one aware row must not break comparisons
+    with the naive rows of the same request.
+    """
     try:
-        user_id = int(user_id)
-        appointments = db.session.query(Appointment, Doctor).join(
-            Doctor, Appointment.doctor_id == Doctor.id
-        ).filter(
-            Appointment.user_id == user_id,
-            Appointment.is_deleted == False
-        ).all()
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = dateparser.parse(value)
+    return parsed.replace(tzinfo=None) if parsed else parsed
 
+def book_appointments_bulk(user_id: str, bookings: list):
+    """Book many appointments for one user in a single transaction.
+
+    Doctors and the user's existing bookings are prefetched once, serials are
+    reserved per (doctor, day) in one counter update each, and the valid rows
+    are inserted together. Returns one result per input row, in order: the
+    booking, or {'error': ...} for rows that failed validation.
+    """
+    user_id = int(user_id)
+    if not db.session.get(User, user_id):
+        return [{'error': 'User not found'} for _ in bookings]
+
+    results = [None] * len(bookings)
+    parsed_dates = {}
+    valid = []
+    for index, booking in enumerate(bookings):
+        if not isinstance(booking, dict):
+            results[index] = {'error': 'Each appointment must be an object'}
+            continue
+        try:
+            doctor_id = int(booking.get('doctor_id'))
+            patient_age = int(booking.get('patient_age'))
+        except (TypeError, ValueError):
+            results[index] = {'error': 'doctor_id and patient_age must be integers'}
+            continue
+        patient_name = (booking.get('patient_name') or '').strip()
+        raw_date = str(booking.get('date') or '')
+        if not patient_name:
+            results[index] = {'error': 'Patient name is required'}
+        elif patient_age <= 0 or patient_age > 150:
+            results[index] = {'error': 'Invalid patient age'}
+        elif not raw_date:
+            results[index] = {'error': 'Date is required'}
+        else:
+            if raw_date not in parsed_dates:
+                parsed_dates[raw_date] = parse_booking_date(raw_date)
+            if parsed_dates[raw_date] is None:
+                results[index] = {'error': 'Invalid date format. Please use ISO format (YYYY-MM-DD HH:MM:SS)'}
+            else:
+                valid.append((index, doctor_id, patient_name, patient_age, parsed_dates[raw_date]))
+
+    doctors = {doctor.id: doctor for doctor in Doctor.query.filter(Doctor.id.in_({row[1] for row in valid})).all()}
+    dates = [row[4] for row in valid]
+    taken = set(db.session.query(Appointment.doctor_id, Appointment.date, Appointment.patient_name).filter(
+        Appointment.user_id == user_id,
+        Appointment.date >= min(dates),
+        Appointment.date <= max(dates),
+        Appointment.is_deleted == False
+    ).all()) if dates else set()
+
+    accepted = defaultdict(list)
+    for index, doctor_id, patient_name, patient_age, when in valid:
+        doctor = doctors.get(doctor_id)
+        if not doctor:
+            results[index] = {'error': 'Doctor not found'}
+        elif not doctor.schedule.accepts(when):
+            results[index] = {'error': f'{doctor.name} is not available at that time ({doctor.availability})'}
+        elif (doctor_id, when, patient_name) in taken:
+            results[index] = {'error': 'Already booked by you'}
+        else:
+            taken.add((doctor_id, when, patient_name))
+            accepted[(doctor_id, when.date())].append((index, patient_name, patient_age, when))
+
+    if not accepted:
+        return results
+    try:
+        rows, indexes = [], []
+        for (doctor_id, day), group in sorted(accepted.items()):
+            first = allocate_serial(doctor_id, day, len(group))
+            # Rows past the day's capacity fail; their serials are handed back
+            room = max(DAILY_CAPACITY - booked_count(doctor_id, day), 0)
+            if room < len(group):
+                release_serials(doctor_id, day, len(group) - room)
+                for index, *_ in group[room:]:
+                    results[index] = {'error': fully_booked_error(doctors[doctor_id], day)}
+                group = accepted[(doctor_id, day)] = group[:room]
+            for serial, (index, patient_name, patient_age, when) in enumerate(group, start=first):
+                indexes.append(index)
+                rows.append({'date': when, 'patient_name': patient_name, 'patient_age': patient_age,
+                             'serial_number': serial, 'user_id': user_id, 'doctor_id': doctor_id,
+                             'is_deleted': False})
+
+        if not rows:
+            db.session.rollback()
+            return results
+
+        if db.engine.dialect.insert_executemany_returning:
+            ids = db.session.scalars(insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True), rows).all()
+        else:
+            appointments = [Appointment(**row) for row in rows]
+            db.session.add_all(appointments)
+            db.session.flush()
+            ids = [appointment.id for appointment in appointments]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for index in (i for group in accepted.values() for i, *_ in group):
+            results[index] = {'error': str(e)}
+        return results
+
+    for index, appointment_id, row in zip(indexes, ids, rows):
+        results[index] = {
+            'appointment_id': appointment_id,
+            'user_id': user_id,
+            'patient_name': row['patient_name'],
+            'doctor_name': doctors[row['doctor_id']].name,
+            'date': str(row['date']),
+            'serial_number': row['serial_number'],
+            'message': 'Appointment booked successfully'
+        }
+    return results
+
+def encode_cursor(when, appointment_id):
+    return base64.urlsafe_b64encode(f'{when.isoformat()}|{appointment_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    """(date, id) from a cursor; raises ValueError when it is malformed"""
+    try:
+        when, appointment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(when), int(appointment_id)
+    except (UnicodeDecodeError, binascii.Error, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def list_user_appointments(user_id, when='all', limit=None, cursor=None):
+    """One page of a user's active appointments as plain rows.
+
+    `when` is 'upcoming' (soonest first), 'past' or 'all' (latest first).
+    Pages are keyset-paginated on (date, id): pass the returned cursor back to
+    get the next page, None means there is no more. Only the listed columns
+    are selected, no ORM objects are built.
+    """
+    if when not in APPOINTMENT_VIEWS:
+        raise ValueError(f"when must be one of {', '.join(APPOINTMENT_VIEWS)}")
+    query = db.session.query(
+        Appointment.id, Appointment.date, Appointment.patient_name, Appointment.serial_number,
+        Doctor.name.label('doctor_name'), Doctor.availability
+    ).join(
+        Doctor, Appointment.doctor_id == Doctor.id
+    ).filter(
+        Appointment.user_id == int(user_id),
+        Appointment.is_deleted == False
+    )
+
+    today = datetime.combine(date.today(), datetime.min.time())
+    if when == 'upcoming':
+        query = query.filter(Appointment.date >= today)
+    elif when == 'past':
+        query = query.filter(Appointment.date < today)
+
+    ascending = when == 'upcoming'
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        if ascending:
+            query = query.filter(or_(Appointment.date > after_date, and_(Appointment.date == after_date, Appointment.id > after_id)))
+        else:
+            query = query.filter(or_(Appointment.date < after_date, and_(Appointment.date == after_date, Appointment.id < after_id)))
+    if ascending:
+        query = query.order_by(Appointment.date, Appointment.id)
+    else:
+        query = query.order_by(Appointment.date.desc(), Appointment.id.desc())
+
+    rows = query.limit(limit + 1 if limit else None).all()
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return rows, next_cursor
+
+def list_appointment_history(user_id, limit=None, cursor=None):
+    """A user's past and cancelled appointments, latest first, from the live
+    table and the archive (see archive.py). Same (date, id) cursor paging as
+    list_user_appointments; rows carry a status of 'completed' or 'cancelled'."""
+    today = datetime.combine(date.today(), datetime.min.time())
+    user_id = int(user_id)
+
+    def rows(table, *conditions):
+        return select(
+            table.id, table.date, table.patient_name, table.serial_number, table.is_deleted,
+            Doctor.name.label('doctor_name'), Doctor.availability
+        ).join(Doctor, table.doctor_id == Doctor.id).where(table.user_id == user_id, *conditions)
+
+    history = union_all(
+        rows(Appointment, Appointment.date < today),
+        rows(AppointmentArchive)
+    ).subquery()
+    query = select(history)
+    if cursor:
+        before_date, before_id = decode_cursor(cursor)
+        query = query.where(or_(history.c.date < before_date, and_(history.c.date == before_date, history.c.id < before_id)))
+    query = query.order_by(history.c.date.desc(), history.c.id.desc()).limit(limit + 1 if limit else None)
+
+    result = db.session.execute(query).all()
+    next_cursor = None
+    if limit and len(result) > limit:
+        result = result[:limit]
+        next_cursor = encode_cursor(result[-1].date, result[-1].id)
+    return result, next_cursor
+
+def get_user_appointments(user_id: str, when='all', limit=None):
+    try:
+        rows, _ = list_user_appointments(user_id, when, limit)
         return [{
-            'id': appointment.id,
-            'doctor_name': doctor.name,
-            'appointment_date': str(appointment.date),
-            'patient_name':appointment.patient_name,
-            'serial_number':appointment.serial_number
-        } for appointment, doctor in appointments]
+            'id': row.id,
+            'doctor_name': row.doctor_name,
+            'appointment_date': str(row.date),
+            'patient_name':row.patient_name,
+            'serial_number':row.serial_number
+        } for row in rows]
     except Exception as e:
         return {'error': str(e)}
 
@@ -0,0 +1,250 @@
+"""Speech recognition for uploaded voice clips.
+
+Uploads are decoded once, in memory, to 16 kHz mono 16-bit PCM and handed to
+the recognizer as sr.AudioData; nothing touches the disk. PCM WAV is read
+with the wave module, everything else (WebM/Opus, Ogg, M4A, MP3, FLAC) goes
+through a single ffmpeg process.
+
+Leading and trailing silence is trimmed before recognition, and clips with no
+speech at all are rejected without calling the recognition service.
+"""
+import io
+import os
+import subprocess
+import threading
+import wave
+
+import numpy as np
+import speech_recognition as sr
+from pydub import AudioSegment
+
+from fakes import FAKE_BACKENDS, CannedRecognizer
+
+Recognizer = CannedRecognizer if FAKE_BACKENDS else sr.Recognizer
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FFMPEG_TIMEOUT = int(os.getenv('FFMPEG_TIMEOUT', 30))
+
+# Voice activity detection over 20 ms frames. A frame is speech when it is
+# VAD_THRESHOLD_DB above the clip's noise floor; frames louder than
+# VAD_SPEECH_DBFS always count and frames quieter than VAD_SILENCE_DBFS never do.
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+VAD_FRAME_MS = 20
+VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', 10))
+VAD_SPEECH_DBFS = float(os.getenv('VAD_SPEECH_DBFS', -20))
+VAD_SILENCE_DBFS = float(os.getenv('VAD_SILENCE_DBFS', -55))
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', 200))
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', 250))
+# Frame levels of steady noise vary by about 1 dB, speech without pauses by several
+VAD_MIN_SPREAD_DB = float(os.getenv('VAD_MIN_SPREAD_DB', 3))
+
+speech_stats = {'clips': 0, 'rejected_silent': 0, 'seconds_received': 0.0, 'seconds_trimmed': 0.0}
+_stats_lock = threading.Lock()
+
+
+class AudioDecodeError(ValueError):
+    """The upload is not audio that can be decoded"""
+
+
+def sniff_format(head):
+    """Container format from the first bytes of a file, or None if unknown"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'\x1aE\xdf\xa3':
+        return 'webm'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xff and head[1] & 0xe0 == 0xe0):
+        return 'mp3'
+    return None
+
+
+# Sample dtype, zero level and scale to int16 per PCM WAV sample width
+WAV_SAMPLES = {1: (np.uint8, 128, 256), 2: ('<i2', 0, 1), 4: ('<i4', 0, 1 / 65536)}
+RESAMPLE_BLOCK = 8192
+
+
+def resample(frames, rate, zero=0, scale=1):
+    """Integer (length, channels) frames at `rate` -> mono int16 at SAMPLE_RATE.
+
+    Linear interpolation, with a box filter against aliasing when
+    downsampling. Output is built block by block from the input slice each
+    block covers, so memory scales with the block, not the upload.
+    """
+    length, channels = frames.shape
+    width = max(rate // SAMPLE_RATE, 1)
+    box = np.full(width, 1 / width, np.float32)
+    step = rate / SAMPLE_RATE
+    # Block-relative input positions; float32 is exact enough within a block
+    ramp = np.arange(RESAMPLE_BLOCK, dtype=np.float32) * np.float32(step)
+    output = np.empty(length * SAMPLE_RATE // rate, np.int16)
+    for start in range(0, len(output), RESAMPLE_BLOCK):
+        count = min(RESAMPLE_BLOCK, len(output) - start)
+        low, high = max(int(start * step) - width, 0), min(int((start + count - 1) * step) + width + 2, length)
+        chunk = frames[low:high]
+        if channels == 1:
+            mono = chunk[:, 0].astype(np.float32)
+        else:
+            mono = np.add(chunk[:, 0], chunk[:, 1], dtype=np.float32)
+            for channel in range(2, channels):
+                mono += chunk[:, channel]
+        if width > 1:
+            mono = np.convolve(mono, box, mode='same')
+        positions = ramp[:count] + np.float32(start * step - low)
+        index = positions.astype(np.intp)
+        samples = mono[index]
+        if rate != SAMPLE_RATE:
+            following = mono[np.minimum(index + 1, len(mono) - 1)]
+            following -= samples
+            positions -= index
+            following *= positions
+            samples += following
+        # Channel mean, zero level and scale to int16 in one pass
+        samples *= scale / channels
+        samples -= zero * scale
+        output[start:start + count] = np.clip(samples, -32768, 32767, out=samples)
+    return output
+
+
+def _wav_pcm(data):
+    """Decode PCM WAV with the standard library; None for encodings it can't read"""
+    stream = io.BytesIO(data)
+    try:
+        with wave.open(stream) as source:
+            channels, width, rate = source.getnchannels(), source.getsampwidth(), source.getframerate()
+            frames = source.getnframes()
+            # The header parser stops at the start of the sample data, so the
+            # samples can be viewed in the upload instead of copied out
+            offset = stream.tell()
+    except (wave.Error, EOFError):
+        return None
+    if width not in WAV_SAMPLES or not rate:
+        return None
+    dtype, zero, scale = WAV_SAMPLES[width]
+    frames = min(frames, (len(data) - offset) // (width * channels))
+    frames = np.frombuffer(data, dtype, frames * channels, offset).reshape(-1, channels)
+    if width == 2 and channels == 1 and rate == SAMPLE_RATE:
+        return frames.reshape(-1)
+    return resample(frames, rate, zero, scale)
+
+
+def _ffmpeg_pcm(data):
+    output = ['-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    command = [AudioSegment.converter, '-hide_banner', '-loglevel', 'error']
+    try:
+        if hasattr(os, 'memfd_create'):
+            # A seekable in-memory file, so M4As with the index at the end decode too
+            fd = os.memfd_create('upload')
+            try:
+                with open(fd, 'wb', closefd=False) as upload:
+                    upload.write(data)
+                result = subprocess.run(command + ['-i', f'/dev/fd/{fd}'] + output, pass_fds=(fd,),
+                                        stdin=subprocess.DEVNULL, capture_output=True, timeout=FFMPEG_TIMEOUT)
+            finally:
+                os.close(fd)
+        else:
+            result = subprocess.run(command + ['-i', 'pipe:0'] + output, input=data,
+                                    capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except FileNotFoundError:
+        raise AudioDecodeError('ffmpeg is required to decode compressed audio')
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError('Audio decoding timed out')
+    if result.returncode != 0:
+        message = result.stderr.decode(errors='replace').strip().splitlines()
+        raise AudioDecodeError(message[-1] if message else 'Audio decoding failed')
+    return np.frombuffer(result.stdout, '<i2')
+
+
+def decode_pcm(data):
+    """Uploaded audio bytes -> 16 kHz mono int16 samples"""
+    if not data:
+        raise AudioDecodeError('Empty audio upload')
+    samples = _wav_pcm(data) if sniff_format(data[:12]) == 'wav' else None
+    if samples is None:
+        samples = _ffmpeg_pcm(data)
+    return samples
+
+
+def frame_levels(samples, frame=SAMPLE_RATE * VAD_FRAME_MS // 1000):
+    """dBFS of each whole frame"""
+    frames = samples[:len(samples) // frame * frame].reshape(-1, frame).astype(np.float32)
+    power = np.einsum('ij,ij->i', frames, frames) / frame
+    return 10 * np.log10(power / 32768 ** 2 + 1e-12)
+
+
+def trim_silence(samples):
+    """(samples without leading and trailing silence, or None when there is no speech)
+
+    The noise floor is the 10th percentile frame level, so it is estimated
+    from the quietest parts of the whole clip instead of a lead-in that may
+    already contain speech. In a clip that is nearly all speech that
+    percentile is speech too, so the floor is only used when the loud part
+    of the clip is VAD_THRESHOLD_DB above it; otherwise, and whenever it
+    would leave too little speech, only frames below VAD_SILENCE_DBFS are
+    trimmed. That fallback needs the levels to vary like speech, by
+    VAD_MIN_SPREAD_DB, so steady noise is still rejected, as is a clip with
+    less than VAD_MIN_SPEECH_MS above VAD_SILENCE_DBFS.
+    """
+    frame = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    levels = frame_levels(samples, frame)
+    if not len(levels):
+        return None
+    min_frames = -(-VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    floor, loud = np.percentile(levels, (10, 90))
+    voiced = ()
+    if loud - floor >= VAD_THRESHOLD_DB:
+        threshold = min(max(floor + VAD_THRESHOLD_DB, VAD_SILENCE_DBFS), VAD_SPEECH_DBFS)
+        voiced = np.flatnonzero(levels > threshold)
+    if len(voiced) < min_frames:
+        if loud - floor < VAD_MIN_SPREAD_DB:
+            return None
+        voiced = np.flatnonzero(levels > VAD_SILENCE_DBFS)
+        if len(voiced) < min_frames:
+            return None
+    padding = VAD_PADDING_MS // VAD_FRAME_MS
+    start = max(voiced[0] - padding, 0) * frame
+    end = min((voiced[-1] + 1 + padding) * frame, len(samples))
+    return samples[start:end]
+
+
+def record_clip(received, trimmed):
+    """Count a clip of `received` seconds; trimmed is None when it was rejected as silent"""
+    with _stats_lock:
+        speech_stats['clips'] += 1
+        speech_stats['seconds_received'] += received
+        if trimmed is None:
+            speech_stats['rejected_silent'] += 1
+        else:
+            speech_stats['seconds_trimmed'] += trimmed
+
+
+def speech_to_text(audio_stream, speech_code):
+    """Transcribe an uploaded audio stream with Google speech recognition.
+
+    Raises AudioDecodeError for uploads that aren't decodable audio,
+    sr.UnknownValueError when nothing intelligible was heard and
+    sr.RequestError when the recognition service fails.
+    """
+    samples = decode_pcm(audio_stream.read())
+    received = len(samples) / SAMPLE_RATE
+    if VAD_ENABLED:
+        samples = trim_silence(samples)
+    if samples is None or not len(samples):
+        record_clip(received, None)
+        print(f"No speech in {received:.2f}s clip, skipping recognition")
+        raise sr.UnknownValueError()
+    trimmed = received - len(samples) / SAMPLE_RATE
+    record_clip(received, trimmed)
+    print(f"Trimmed {trimmed:.2f}s of silence from {received:.2f}s clip")
+    audio_data = sr.AudioData(samples.tobytes(), SAMPLE_RATE, SAMPLE_WIDTH)
+
+    # Create a NEW recognizer per request to avoid shared state
+    local_recognizer = Recognizer()
+    user_text = local_recognizer.recognize_google(audio_data, language=speech_code)
+    print(f"User text: {user_text}")
+    return user_text
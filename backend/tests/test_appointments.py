@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from service import APPOINTMENT_PAGE_SIZE
+
+COUNT = APPOINTMENT_PAGE_SIZE + 10
+
+
+@pytest.fixture(scope='module')
+def many_headers(flask_app, client):
+    """A user with more appointments than one page"""
+    from models import Appointment, User, db
+    client.post('/register', json={'username': 'busy', 'password': 'secret'})
+    token = client.post('/login', json={'username': 'busy', 'password': 'secret'}).get_json()['access_token']
+    with flask_app.app_context():
+        user_id = User.query.filter_by(username='busy').one().id
+        start = datetime(2030, 1, 7)
+        db.session.add_all(Appointment(
+            date=start + timedelta(days=i), patient_name=f'Patient {i}', patient_age=30,
+            serial_number=1, user_id=user_id, doctor_id=1) for i in range(COUNT))
+        db.session.commit()
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_plain_get_returns_every_appointment(client, many_headers):
+    response = client.get('/appointments', headers=many_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == COUNT
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_limit_pages_through_with_cursor(client, many_headers):
+    seen = []
+    url = '/appointments?limit=25'
+    while url:
+        response = client.get(url, headers=many_headers)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 25
+        seen += [row['id'] for row in page]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/appointments?limit=25&cursor={cursor}' if cursor else None
+    assert len(seen) == len(set(seen)) == COUNT
+
+
+def test_bad_cursor_is_rejected(client, many_headers):
+    assert client.get('/appointments?cursor=nonsense', headers=many_headers).status_code == 400
@@ -0,0 +1,33 @@
+"""Parallel tool calls on the ASGI path, each needing the database"""
+import asyncio
+
+from agent.model import model
+
+PARALLEL_TOOLS_TURN = 'compare everything at once'
+REQUESTS = 60
+
+
+def test_parallel_tool_calls_under_concurrent_requests(flask_app, monkeypatch):
+    from agent.app import arun_chatbot
+    from asgi import run_sync
+
+    monkeypatch.setitem(model.script, PARALLEL_TOOLS_TURN, [{'tool_calls': [
+        {'name': 'doctor_list', 'args': {}},
+        {'name': 'get_appointment_list', 'args': {'user_id': '{user_id}'}},
+        {'name': 'doctor_availability', 'args': {'doctor_id': '1', 'days': 7}},
+        {'name': 'find_doctors', 'args': {'query': 'pregnancy'}},
+    ]}])
+
+    async def turn(i):
+        # Same app context nesting as asgi.process_text
+        with flask_app.app_context():
+            return await arun_chatbot(PARALLEL_TOOLS_TURN, f'parallel-{i}', run_sync)
+
+    async def main():
+        return await asyncio.gather(*(turn(i) for i in range(REQUESTS)), return_exceptions=True)
+
+    replies = asyncio.run(main())
+    failures = [r for r in replies if isinstance(r, Exception) or 'error' in str(r).lower()]
+    assert not failures, f'{len(failures)} of {REQUESTS} failed, e.g. {failures[0]!r}'
+    # The reply quotes the last tool result, find_doctors
+    assert all('gynecology' in reply for reply in replies)
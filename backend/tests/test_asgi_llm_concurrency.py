@@ -0,0 +1,31 @@
+"""Slow LLM calls on the ASGI path must not queue behind the DB thread pool"""
+import asyncio
+import time
+
+from agent.model import model
+
+LATENCY = 0.5
+
+
+def test_llm_turns_beyond_db_threads_run_concurrently(flask_app, monkeypatch):
+    from agent.app import arun_chatbot
+    from asgi import DB_POOL_THREADS, lifespan, run_sync
+
+    monkeypatch.setattr(model, 'latency', LATENCY)
+    turns = DB_POOL_THREADS * 3
+
+    async def turn(i):
+        with flask_app.app_context():
+            return await arun_chatbot(f'tell me something {i}', f'llm-concurrency-{i}', run_sync)
+
+    async def main():
+        # Server startup; not shutdown, which would close the shared pools
+        await lifespan(None).__aenter__()
+        start = time.perf_counter()
+        replies = await asyncio.gather(*(turn(i) for i in range(turns)))
+        return replies, time.perf_counter() - start
+
+    replies, elapsed = asyncio.run(main())
+    assert all(reply.startswith('You said:') for reply in replies)
+    # Batches of DB_POOL_THREADS would take at least three LLM latencies
+    assert elapsed < LATENCY * 2, f'{turns} turns took {elapsed:.2f}s'
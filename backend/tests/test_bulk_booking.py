@@ -0,0 +1,31 @@
+"""Bulk booking date handling"""
+from datetime import date, datetime, timedelta
+
+from models import Appointment, Doctor, User, db
+import service
+
+
+def test_bulk_booking_accepts_mixed_naive_and_aware_dates(flask_app, client):
+    client.post('/register', json={'username': 'bulk-tz', 'password': 'secret'})
+    with flask_app.app_context():
+        user_id = User.query.filter_by(username='bulk-tz').one().id
+        day = db.session.get(Doctor, 3).schedule.next_available_days(date.today() + timedelta(days=300), 1)[0]
+        rows = [
+            {'doctor_id': 3, 'patient_name': 'Naive', 'patient_age': 30, 'date': f'{day}T09:00:00'},
+            {'doctor_id': 3, 'patient_name': 'Aware', 'patient_age': 31, 'date': f'{day}T10:00:00+06:00'},
+            {'doctor_id': 3, 'patient_name': 'Zulu', 'patient_age': 32, 'date': f'{day}T11:00:00Z'},
+        ]
+        results = service.book_appointments_bulk(str(user_id), rows)
+        assert all('error' not in result for result in results), results
+        assert len({result['serial_number'] for result in results}) == 3
+
+        stored = {a.patient_name: a.date for a in Appointment.query.filter_by(user_id=user_id)}
+        assert stored == {
+            'Naive': datetime.combine(day, datetime.min.time()).replace(hour=9),
+            'Aware': datetime.combine(day, datetime.min.time()).replace(hour=10),
+            'Zulu': datetime.combine(day, datetime.min.time()).replace(hour=11),
+        }
+
+        # Re-sending the same rows is caught as duplicates, offset or not
+        again = service.book_appointments_bulk(str(user_id), rows)
+        assert all('error' in result for result in again), again
@@ -0,0 +1,59 @@
+"""Bookings stop at DAILY_CAPACITY per doctor per day"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import service
+from models import Appointment, Doctor, User, db
+
+CAPACITY = 3
+
+
+@pytest.fixture
+def day_and_user(flask_app, client, monkeypatch):
+    monkeypatch.setattr(service, 'DAILY_CAPACITY', CAPACITY)
+    client.post('/register', json={'username': 'capacity', 'password': 'secret'})
+    with flask_app.app_context():
+        user_id = User.query.filter_by(username='capacity').one().id
+        doctor = db.session.get(Doctor, 2)
+        # A working day no other test books
+        days = doctor.schedule.next_available_days(date.today() + timedelta(days=200), 20)
+        used = {a.date.date() for a in Appointment.query.filter_by(doctor_id=2)}
+        day = next(day for day in days if day not in used)
+        yield datetime.combine(day, datetime.min.time()), user_id
+
+
+def book(user_id, when, name):
+    return service.book_appointment(str(user_id), '2', name, 30, when)
+
+
+def test_single_booking_stops_at_capacity(flask_app, day_and_user):
+    when, user_id = day_and_user
+    with flask_app.app_context():
+        results = [book(user_id, when, f'Patient {i}') for i in range(CAPACITY + 1)]
+        assert [r.get('serial_number') for r in results[:CAPACITY]] == list(range(1, CAPACITY + 1))
+        full = results[-1]
+        assert 'fully booked' in full['error']
+        assert len(full['next_available_days']) == 3
+        assert when.strftime('%a, %B %d, %Y') not in full['next_available_days']
+        availability = service.get_doctor_availability([2], when.date(), 1)[0]['days']
+        assert availability == [{'date': when.date().isoformat(), 'booked': CAPACITY, 'remaining': 0}]
+
+        # A cancellation frees a place; serials keep counting up
+        service.cancel_appointment(results[0]['appointment_id'], str(user_id))
+        assert book(user_id, when, 'Late patient')['serial_number'] == CAPACITY + 1
+
+
+def test_bulk_booking_fails_only_rows_past_capacity(flask_app, day_and_user):
+    when, user_id = day_and_user
+    with flask_app.app_context():
+        book(user_id, when, 'Walk-in')
+        rows = [{'doctor_id': 2, 'patient_name': f'Bulk {i}', 'patient_age': 40, 'date': when.isoformat()}
+                for i in range(CAPACITY)]
+        results = service.book_appointments_bulk(str(user_id), rows)
+        assert [r.get('serial_number') for r in results] == [2, 3, None]
+        assert 'fully booked' in results[-1]['error']
+        # The failed row's serial was handed back
+        assert book(user_id, when + timedelta(hours=1), 'Other')['error']
+        service.cancel_appointment(results[0]['appointment_id'], str(user_id))
+        assert book(user_id, when, 'After cancel')['serial_number'] == 4
@@ -0,0 +1,61 @@
+import pytest
+
+from doctor_search import find_doctors, query_specialties
+
+
+@pytest.mark.parametrize('query', [
+    'Dr. Rashidul Hasan Shafin',  # "rash"
+    'I want an early appointment',  # "ear"
+    'what is the serial number',  # "numb"
+    'Sharmin Rahman',
+    'Mir Jakib Hossain',
+    'coldplay tickets',  # "cold"
+    'দোকানে যাব',  # "কান" inside "shop"
+    'ডাক্তার নাকি নার্স',  # "নাক" at the start of the particle নাকি
+])
+def test_words_that_only_contain_a_symptom_do_not_match(query):
+    assert query_specialties(query) == []
+
+
+@pytest.mark.parametrize('query, specialty', [
+    ('skin rash', 'dermatology'),
+    ('rashes on my arm', 'dermatology'),
+    ('my ears hurt', 'ent'),
+    ('numbness in my hand', 'neurology'),
+    ('I am pregnant', 'gynecology'),
+    ('pain in the abdomen', 'gastroenterology'),
+    ('doctor for my kids', 'pediatrics'),
+    ('children specialist', 'pediatrics'),
+    ('পেটে ব্যথা', 'gastroenterology'),
+    ('বাচ্চার জ্বর', 'pediatrics'),
+    ('গলায় ব্যথা', 'ent'),
+    ('গর্ভবতী', 'gynecology'),
+    ('দাঁতের ডাক্তার', 'dentistry'),
+    ('কানে ব্যথা', 'ent'),
+    ('নাকে সমস্যা', 'ent'),
+])
+def test_symptoms_map_to_specialties(query, specialty):
+    assert specialty in query_specialties(query)
+
+
+def test_particle_does_not_add_a_specialty():
+    assert query_specialties('আমার নাকি জ্বর') == ['internal medicine']
+
+
+@pytest.mark.parametrize('query, name', [
+    ('Rashidul', 'DR. RASHIDUL HASAN SHAFIN'),
+    ('Dr. Rashidul Hasan', 'DR. RASHIDUL HASAN SHAFIN'),
+    ('Rokeya Khatun', 'Dr. Rokeya Khatun'),
+])
+def test_name_search_finds_the_doctor(flask_app, query, name):
+    with flask_app.app_context():
+        specialties, doctors = find_doctors(query)
+    assert specialties == []
+    assert doctors[0]['name'] == name
+
+
+def test_symptom_search_ranks_the_specialty_first(flask_app):
+    with flask_app.app_context():
+        specialties, doctors = find_doctors('my baby has a fever')
+    assert specialties[0] == 'pediatrics'
+    assert doctors[0]['name'] == 'DR. RASHIDUL HASAN SHAFIN'
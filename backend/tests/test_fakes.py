@@ -0,0 +1,36 @@
+"""The async fakes must not block the event loop, or ASGI benchmarks measure the fakes"""
+import asyncio
+import time
+
+import fakes
+from agent.model import model
+
+LATENCY = 0.2
+CALLS = 10
+
+
+def run_concurrently(make_call):
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(make_call() for _ in range(CALLS)))
+        return time.perf_counter() - start
+    return asyncio.run(main())
+
+
+def test_async_chat_calls_overlap(monkeypatch):
+    monkeypatch.setattr(model, 'latency', LATENCY)
+    assert run_concurrently(lambda: model.ainvoke('hello')) < LATENCY * 3
+
+
+def test_async_chat_stream_overlaps(monkeypatch):
+    monkeypatch.setattr(model, 'latency', LATENCY)
+
+    async def stream():
+        return [chunk async for chunk in model.astream('hello there')]
+
+    assert run_concurrently(stream) < LATENCY * 3
+
+
+def test_async_tts_overlaps(monkeypatch):
+    monkeypatch.setattr(fakes, 'FAKE_TTS_LATENCY', LATENCY)
+    assert run_concurrently(lambda: fakes.afake_synthesize('hello')) < LATENCY * 3
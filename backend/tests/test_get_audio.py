@@ -0,0 +1,65 @@
+"""GET /get-audio waiting on background TTS, on the Flask and ASGI servers"""
+import asyncio
+import time
+import uuid
+
+import httpx
+import pytest
+
+import fakes
+from tts_jobs import TTS_WAIT_SECONDS, submit_tts, wait_seconds
+
+TTS_LATENCY = 1.0
+
+
+def queue_job(text='Your appointment is confirmed'):
+    audio_id = str(uuid.uuid4())
+    assert submit_tts(audio_id, f'{text} {audio_id}')
+    return audio_id
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, TTS_WAIT_SECONDS), ('2.5', 2.5), ('-3', 0.0), ('1e9', TTS_WAIT_SECONDS),
+])
+def test_wait_is_clamped(value, expected):
+    assert wait_seconds(value) == expected
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', 'soon'])
+def test_wait_must_be_a_finite_number(client, value):
+    start = time.perf_counter()
+    response = client.get(f'/get-audio/{queue_job()}?wait={value}')
+    assert response.status_code == 400
+    assert time.perf_counter() - start < 0.5
+
+
+def test_flask_route_waits_for_the_audio(client):
+    response = client.get(f'/get-audio/{queue_job()}?wait=5')
+    assert response.status_code == 200
+    assert response.mimetype == 'audio/mpeg'
+
+
+def test_asgi_waiting_clients_do_not_hold_wsgi_threads(monkeypatch):
+    from asgi import WSGI_THREADS, app
+
+    monkeypatch.setattr(fakes, 'FAKE_TTS_LATENCY', TTS_LATENCY)
+    audio_id = queue_job('Waiting clients')
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as http:
+            waiting = [asyncio.create_task(http.get(f'/get-audio/{audio_id}?wait=5'))
+                       for _ in range(WSGI_THREADS + 4)]
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            doctors = await http.get('/doctors')
+            doctors_seconds = time.perf_counter() - start
+            bad_wait = await http.get(f'/get-audio/{audio_id}?wait=nan')
+            return doctors, doctors_seconds, bad_wait, await asyncio.gather(*waiting)
+
+    doctors, doctors_seconds, bad_wait, audio = asyncio.run(main())
+    assert doctors.status_code == 200
+    assert doctors_seconds < TTS_LATENCY / 2
+    assert bad_wait.status_code == 400
+    assert [response.status_code for response in audio] == [200] * (WSGI_THREADS + 4)
+    assert 'Accept' in audio[0].headers['vary']
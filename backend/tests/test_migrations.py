@@ -0,0 +1,63 @@
+"""Schema migrations and engine setup, on SQLite or the TEST_DATABASE_URL server"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from db import database_url
+from migrations import MIGRATIONS, current_version, migrate
+
+LATEST = MIGRATIONS[-1][0]
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('postgres://u:p@db:5432/app', 'postgresql+psycopg://u:p@db:5432/app'),
+    ('postgresql://u:p@db:5432/app', 'postgresql+psycopg://u:p@db:5432/app'),
+    ('postgresql+psycopg2://u:p@db/app', 'postgresql+psycopg2://u:p@db/app'),
+    ('sqlite:///appointment_system.db', 'sqlite:///appointment_system.db'),
+])
+def test_database_url_driver(monkeypatch, url, expected):
+    monkeypatch.setenv('DATABASE_URL', url)
+    assert database_url() == expected
+
+
+def test_startup_applied_every_migration(db_engine):
+    with db_engine.connect() as connection:
+        assert current_version(connection) == LATEST
+    assert migrate(db_engine) == []
+
+
+def test_migrations_rerun_on_current_schema(db_engine):
+    # A database stamped before any migration, but with today's tables
+    with db_engine.begin() as connection:
+        connection.execute(text('DELETE FROM schema_version'))
+    assert migrate(db_engine) == [version for version, _, _ in MIGRATIONS]
+    with db_engine.connect() as connection:
+        assert current_version(connection) == LATEST
+        assert connection.execute(text("SELECT version FROM data_version WHERE name = 'doctors'")).scalar() >= 1
+
+
+def test_connection_from_another_process_is_replaced(flask_app):
+    engine = create_engine(flask_app.config['SQLALCHEMY_DATABASE_URI'], pool_size=1, max_overflow=0)
+    try:
+        with engine.connect() as connection:
+            record = connection.connection._connection_record
+            stale = connection.connection.dbapi_connection
+            # As if the pool had been inherited across a fork
+            record.info['pid'] = -1
+        with engine.connect() as connection:
+            assert connection.connection.dbapi_connection is not stale
+            assert connection.execute(text('SELECT 1')).scalar() == 1
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.server_db
+def test_server_engine_uses_psycopg_with_health_checks(db_engine):
+    assert db_engine.dialect.name == 'postgresql'
+    assert db_engine.dialect.driver == 'psycopg'
+    assert db_engine.pool._pre_ping
+
+
+@pytest.mark.server_db
+def test_password_hash_column_is_widened(db_engine):
+    column = next(c for c in inspect(db_engine).get_columns('user') if c['name'] == 'password_hash')
+    assert column['type'].length >= 256
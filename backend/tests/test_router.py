@@ -0,0 +1,28 @@
+import pytest
+
+from agent.router import ROUTER_CONFIDENCE, classify
+
+
+@pytest.mark.parametrize('text', [
+    'show doctors', 'list all doctors', 'show me the available doctors', 'doctor list',
+    'which doctors are available', 'all doctors', 'available doctors', 'who are the doctors',
+    'ডাক্তারদের তালিকা দেখাও',
+])
+def test_explicit_doctor_listing_is_routed(text):
+    intent, _, confidence = classify(text)
+    assert intent == 'list_doctors'
+    assert confidence >= ROUTER_CONFIDENCE
+
+
+@pytest.mark.parametrize('text', [
+    'doctor', 'dr', 'doctors', 'see doctor', 'I want to see doctor', 'see a doctor', 'I need a doctor',
+    'please doctor', 'ডাক্তার', 'আমি ডাক্তার দেখাতে চাই',
+])
+def test_bare_doctor_phrases_go_to_the_agent(text):
+    intent, _, confidence = classify(text)
+    assert intent != 'list_doctors' or confidence < ROUTER_CONFIDENCE
+
+
+def test_other_intents_still_routed():
+    assert classify('show my appointments')[0] == 'list_appointments'
+    assert classify('cancel appointment 12') == ('cancel_appointment', {'id': '12'}, 0.95)
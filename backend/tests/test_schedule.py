@@ -0,0 +1,66 @@
+from datetime import date, datetime
+
+import pytest
+
+from schedule import compile_schedule
+
+# 2026-01-05 is a Monday
+MON, FRI, SAT, SUN = date(2026, 1, 5), date(2026, 1, 9), date(2026, 1, 10), date(2026, 1, 11)
+
+
+def at(day, hour, minute=0):
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+@pytest.mark.parametrize('availability, days', [
+    ('Mon-Fri 9AM-5PM', 'Mon Tue Wed Thu Fri'),
+    ('Tue-Thu 10AM-6PM', 'Tue Wed Thu'),
+    ('Mon, Wed, Fri 8AM-4PM', 'Mon Wed Fri'),
+    ('Mon-Sat 9AM-3PM', 'Mon Tue Wed Thu Fri Sat'),
+    ('Mon-Fri 9AM-5PM, Sat 10AM-1PM', 'Mon Tue Wed Thu Fri Sat'),
+    ('Mon-Wed, Fri 9AM-1PM; Sat 10AM-2PM', 'Mon Tue Wed Fri Sat'),
+])
+def test_working_days(availability, days):
+    assert compile_schedule(availability).describe() == ', '.join(days.split())
+
+
+def test_comma_starts_a_new_day_group():
+    schedule = compile_schedule('Mon-Fri 9AM-5PM, Sat 10AM-1PM')
+    assert schedule.accepts(at(FRI, 16))
+    assert schedule.accepts(at(SAT, 11))
+    assert not schedule.accepts(at(SAT, 16))
+    assert not schedule.accepts(at(MON, 8))
+
+
+def test_comma_inside_day_list_keeps_one_group():
+    schedule = compile_schedule('Mon, Wed, Fri 8AM-4PM')
+    assert schedule.accepts(at(FRI, 8))
+    assert not schedule.accepts(at(FRI, 17))
+    assert not schedule.accepts(at(SAT, 9))
+
+
+def test_extra_hours_after_comma_apply_to_previous_days():
+    schedule = compile_schedule('Mon 9AM-12PM, 2PM-5PM')
+    assert schedule.accepts(at(MON, 15))
+    assert not schedule.accepts(at(MON, 13))
+
+
+def test_overnight_window_wraps_past_midnight():
+    schedule = compile_schedule('Fri 10PM-2AM')
+    assert schedule.accepts(at(FRI, 23))
+    assert schedule.accepts(at(SAT, 1, 30))
+    assert not schedule.accepts(at(SAT, 2, 30))
+    assert not schedule.accepts(at(FRI, 21))
+    assert schedule.works_on(FRI) and not schedule.works_on(SAT)
+
+
+def test_overnight_window_on_sunday_wraps_to_monday():
+    schedule = compile_schedule('Sun 8PM-1AM')
+    assert schedule.accepts(at(SUN, 21))
+    assert schedule.accepts(at(MON, 0, 30))
+
+
+def test_unparseable_accepts_every_day():
+    schedule = compile_schedule('by appointment')
+    assert not schedule.known
+    assert schedule.accepts(at(SUN, 3))
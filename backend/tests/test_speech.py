@@ -0,0 +1,104 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+import speech_recognition as sr
+
+from speech import SAMPLE_RATE, decode_pcm, speech_to_text, trim_silence
+
+
+def voice(seconds, dbfs):
+    """Continuous voiced sound (harmonics with a shallow syllable envelope) at dbfs RMS"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 8))
+    signal *= 0.8 + 0.2 * np.sin(2 * np.pi * 4 * t)
+    return signal * 10 ** (dbfs / 20) * 32768 / np.sqrt(np.mean(signal ** 2))
+
+
+def noise(seconds, dbfs):
+    return np.random.default_rng(0).normal(0, 10 ** (dbfs / 20) * 32768, int(seconds * SAMPLE_RATE))
+
+
+def pcm(signal):
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def padded(speech, padding, noise_dbfs):
+    """speech with `padding` seconds of noise on each side"""
+    clip = noise(len(speech) / SAMPLE_RATE + 2 * padding, noise_dbfs)
+    start = int(padding * SAMPLE_RATE)
+    clip[start:start + len(speech)] += speech
+    return pcm(clip)
+
+
+@pytest.mark.parametrize('seconds', [0.6, 1, 2])
+@pytest.mark.parametrize('dbfs', [-26, -30, -35])
+def test_fully_voiced_clip_is_kept_whole(seconds, dbfs):
+    samples = pcm(voice(seconds, dbfs))
+    trimmed = trim_silence(samples)
+    assert trimmed is not None
+    assert len(trimmed) == len(samples)
+
+
+@pytest.mark.parametrize('dbfs', [-50, -45, -40, -30])
+def test_steady_noise_is_rejected(dbfs):
+    assert trim_silence(pcm(noise(3, dbfs))) is None
+
+
+@pytest.mark.parametrize('padding', [0.1, 0.2, 0.3])
+@pytest.mark.parametrize('dbfs', [-26, -30])
+def test_tightly_cropped_speech_over_noise_is_kept(padding, dbfs):
+    speech = voice(1, dbfs)
+    trimmed = trim_silence(padded(speech, padding, -38))
+    assert trimmed is not None
+    assert len(trimmed) >= len(speech)
+
+
+def test_silence_around_speech_is_trimmed():
+    samples = padded(voice(1, -25), 1.5, -50)
+    trimmed = trim_silence(samples)
+    assert trimmed is not None
+    assert len(samples) - len(trimmed) > SAMPLE_RATE
+
+
+@pytest.mark.parametrize('samples', [
+    pcm(noise(2, -60)),
+    np.zeros(SAMPLE_RATE, np.int16),
+    pcm(noise(0.1, -20)),
+])
+def test_clip_without_enough_sound_is_rejected(samples):
+    assert trim_silence(samples) is None
+
+
+def wav_bytes(samples, rate=SAMPLE_RATE):
+    """samples is (length,) or (length, channels); the sample width follows its dtype"""
+    data = io.BytesIO()
+    with wave.open(data, 'wb') as out:
+        out.setnchannels(1 if samples.ndim == 1 else samples.shape[1])
+        out.setsampwidth(samples.itemsize)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+    return io.BytesIO(data.getvalue())
+
+
+@pytest.mark.parametrize('rate', [8000, 16000, 22050, 44100, 48000])
+@pytest.mark.parametrize('channels', [1, 2])
+@pytest.mark.parametrize('dtype, zero, scale', [(np.uint8, 128, 1 / 256), (np.int16, 0, 1), (np.int32, 0, 65536)])
+def test_pcm_wav_decodes_to_16k_mono(rate, channels, dtype, zero, scale):
+    tone = np.sin(2 * np.pi * 440 * np.arange(rate) / rate) * 10000
+    frames = np.repeat((tone * scale + zero).astype(dtype)[:, None], channels, axis=1)
+    samples = decode_pcm(wav_bytes(frames, rate).read())
+    assert samples.dtype == np.int16 and len(samples) == SAMPLE_RATE
+    expected = np.sin(2 * np.pi * 440 * np.arange(SAMPLE_RATE) / SAMPLE_RATE) * 10000
+    # Interpolation, box filter delay and 8-bit quantization stay well under 10%
+    assert np.abs(samples[50:-50] - expected[50:-50]).max() < 600
+
+
+def test_fully_voiced_upload_reaches_recognition():
+    assert speech_to_text(wav_bytes(pcm(voice(0.8, -30))), 'en-US')
+
+
+def test_silent_upload_skips_recognition():
+    with pytest.raises(sr.UnknownValueError):
+        speech_to_text(wav_bytes(np.zeros(SAMPLE_RATE, np.int16)), 'en-US')
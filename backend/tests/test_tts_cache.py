@@ -0,0 +1,22 @@
+import tts
+from tts_cache import AudioCache
+
+
+def test_key_separates_backend_and_encoder_settings():
+    base = AudioCache.key('Hello there', 'Kore', 'gemini', 'mp3', '-b:a 32k')
+    assert AudioCache.key('Hello   there', 'Kore', 'gemini', 'mp3', '-b:a 32k') == base
+    assert AudioCache.key('Hello there', 'Kore', 'fake', 'mp3', '-b:a 32k') != base
+    assert AudioCache.key('Hello there', 'Kore', 'gemini', 'mp3', '-b:a 64k') != base
+
+
+def test_fake_backend_audio_is_not_keyed_as_real_speech(monkeypatch):
+    fake_key = tts._cache_key('Hello there', 'mp3')
+    monkeypatch.setattr(tts, 'FAKE_BACKENDS', False)
+    assert tts._cache_key('Hello there', 'mp3') != fake_key
+
+
+def test_bitrate_is_part_of_the_key(monkeypatch):
+    before = tts._cache_key('Hello there', 'mp3')
+    extension, mimetype, _ = tts.AUDIO_FORMATS['mp3']
+    monkeypatch.setitem(tts.AUDIO_FORMATS, 'mp3', (extension, mimetype, ['-c:a', 'libmp3lame', '-b:a', '64k', '-f', 'mp3']))
+    assert tts._cache_key('Hello there', 'mp3') != before
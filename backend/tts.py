@@ -1,9 +1,16 @@
 from google import genai
 from google.genai import types
+import os
+import subprocess
+import uuid
 import wave
 from dotenv import load_dotenv
+from pydub import AudioSegment
 load_dotenv()
 
+from fakes import FAKE_BACKENDS, afake_synthesize, fake_synthesize
+from tts_cache import tts_cache
+
 # Set up the wave file to save the output:
 def wave_file(filename, pcm, channels=1, rate=24000, sample_width=2):
    with wave.open(filename, "wb") as wf:
@@ -14,28 +21,110 @@ def wave_file(filename, pcm, channels=1, rate=24000, sample_width=2):
 
 
 
-def gen_audio_file(filename: str, text: str):
+TTS_MODEL = "gemini-2.5-flash-preview-tts"
+TTS_VOICE = 'Kore'
+TTS_RATE = 24000
+
+# Format replies are stored and served in: mp3, opus (Ogg) or wav. Clients can
+# still ask GET /get-audio for WAV, which is then decoded from the stored file.
+TTS_AUDIO_FORMAT = os.getenv('TTS_AUDIO_FORMAT', 'mp3')
+# format -> (file extension, mimetype, ffmpeg encoder arguments)
+AUDIO_FORMATS = {
+    'wav': ('wav', 'audio/wav', None),
+    'mp3': ('mp3', 'audio/mpeg', ['-c:a', 'libmp3lame', '-b:a', os.getenv('TTS_AUDIO_BITRATE', '32k'), '-f', 'mp3']),
+    'opus': ('ogg', 'audio/ogg', ['-c:a', 'libopus', '-b:a', os.getenv('TTS_AUDIO_BITRATE', '16k'),
+                                  '-application', 'voip', '-compression_level', '5', '-f', 'ogg']),
+}
+
+def speech_config():
+    return types.GenerateContentConfig(
+    response_modalities=["AUDIO"],
+    speech_config=types.SpeechConfig(
+        voice_config=types.VoiceConfig(
+            prebuilt_voice_config=types.PrebuiltVoiceConfig(
+            voice_name=TTS_VOICE,
+            )
+        )
+    ),
+    )
+
+def synthesize(text: str):
+    """Returns 24 kHz 16-bit mono PCM for text"""
     client = genai.Client()
     response = client.models.generate_content(
-    model="gemini-2.5-flash-preview-tts",
+    model=TTS_MODEL,
     contents=text,
-    config=types.GenerateContentConfig(
-        response_modalities=["AUDIO"],
-        speech_config=types.SpeechConfig(
-            voice_config=types.VoiceConfig(
-                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                voice_name='Kore',
-                )
-            )
-        ),
+    config=speech_config()
+    )
+    return response.candidates[0].content.parts[0].inline_data.data
+
+async def asynthesize(text: str):
+    """synthesize on google-genai's async client, for the ASGI server"""
+    client = genai.Client()
+    response = await client.aio.models.generate_content(
+    model=TTS_MODEL,
+    contents=text,
+    config=speech_config()
     )
+    return response.candidates[0].content.parts[0].inline_data.data
+
+if FAKE_BACKENDS:
+    synthesize = fake_synthesize
+    asynthesize = afake_synthesize
+
+def encode_audio(filename, pcm, audio_format, rate=TTS_RATE):
+    """Write 16-bit mono PCM to filename in audio_format; ffmpeg encodes as the PCM is piped in"""
+    encoder = AUDIO_FORMATS[audio_format][2]
+    if encoder is None:
+        wave_file(filename, pcm, rate=rate)
+        return
+    result = subprocess.run(
+        [AudioSegment.converter, '-hide_banner', '-loglevel', 'error', '-y',
+         '-f', 's16le', '-ar', str(rate), '-ac', '1', '-i', 'pipe:0', *encoder, filename],
+        input=pcm, capture_output=True
     )
+    if result.returncode != 0:
+        raise RuntimeError(f"Audio encoding failed: {result.stderr.decode(errors='replace').strip()}")
 
-    data = response.candidates[0].content.parts[0].inline_data.data
-    
-    wave_file(filename, data) # Saves the file to current directory
+def decode_to_wav(source, target):
+    """WAV copy of a stored compressed reply, for clients that only play WAV"""
+    partial = f'{target}.{uuid.uuid4().hex}.part'
+    result = subprocess.run(
+        [AudioSegment.converter, '-hide_banner', '-loglevel', 'error', '-y', '-i', source,
+         '-ac', '1', '-ar', str(TTS_RATE), '-c:a', 'pcm_s16le', '-f', 'wav', partial],
+        stdin=subprocess.DEVNULL, capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Audio decoding failed: {result.stderr.decode(errors='replace').strip()}")
+    os.replace(partial, target)
+
+def _cache_key(text, audio_format):
+    # Fake tones must never be served as speech to a real run sharing the cache
+    extension, _, encoder = AUDIO_FORMATS[audio_format]
+    return tts_cache and tts_cache.key(text, TTS_VOICE, 'fake' if FAKE_BACKENDS else TTS_MODEL,
+                                       extension, ' '.join(encoder or ()))
+
+def _save(filename, audio_format, key, data):
+    encode_audio(filename, data, audio_format)
+    if key:
+        tts_cache.store(key, filename)
     print('--------------audio file saved---------------')
 
+def gen_audio_file(filename: str, text: str, audio_format: str = 'wav'):
+    # Repeated phrases are served from the cache without calling the TTS API
+    key = _cache_key(text, audio_format)
+    if key and tts_cache.fetch(key, filename):
+        print('--------------audio file served from cache---------------')
+        return
+    _save(filename, audio_format, key, synthesize(text))
+
+async def agen_audio_file(filename: str, text: str, audio_format: str = 'wav'):
+    key = _cache_key(text, audio_format)
+    if key and tts_cache.fetch(key, filename):
+        print('--------------audio file served from cache---------------')
+        return
+    _save(filename, audio_format, key, await asynthesize(text))
+
 if __name__ == '__main__':
    bengali_text = """
 আমার সোনার বাংলা, আমি তোমায় ভালোবাসি।
@@ -0,0 +1,116 @@
+"""Content-addressed cache of synthesized speech.
+
+Audio is stored under TTS_CACHE_DIR as <sha256 of backend, voice, encoder
+settings and text>.<extension>, shared by all workers. Hits are hard-linked
+(or copied, across filesystems) to the requested output path without calling
+the TTS API. When the directory grows past TTS_CACHE_MB the least recently
+used files are deleted; a hit refreshes the file's mtime, which is what
+recency is judged by.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TTS_CACHE_DIR = os.path.join(BACKEND_DIR, 'instance', 'tts_cache')
+TTS_CACHE_ENABLED = os.getenv('TTS_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+TTS_CACHE_MB = int(os.getenv('TTS_CACHE_MB', 256))
+
+
+class AudioCache:
+    """Size-capped, LRU-evicted store of audio files keyed by content hash"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'bytes_saved': 0}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, model, suffix='wav', encoding=''):
+        """`model` names the backend that made the audio and `encoding` the
+        encoder settings (codec, bitrate), so neither is served for the other"""
+        text = ' '.join(text.split())
+        digest = hashlib.sha256(f'{model}\0{voice}\0{encoding}\0{text}'.encode('utf-8')).hexdigest()
+        return f'{digest}.{suffix}'
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    @staticmethod
+    def _place(source, target):
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+    def fetch(self, key, target):
+        """Put the cached audio for key at target; False on a miss"""
+        path = self._path(key)
+        try:
+            self._place(path, target)
+            os.utime(path)
+        except FileNotFoundError:
+            # Also covers an entry evicted by another worker mid-hit
+            self._count('misses')
+            return False
+        self._count('hits')
+        self._count('bytes_saved', os.path.getsize(target))
+        return True
+
+    def store(self, key, source):
+        """Add the file at source under key, then evict down to the size cap"""
+        partial = self._path(f'{key}.{uuid.uuid4().hex}.part')
+        try:
+            self._place(source, partial)
+            os.replace(partial, self._path(key))
+            self._count('stores')
+            self.evict()
+        except OSError as e:
+            # The cache is best effort; the synthesized file is already in place
+            print(f"TTS cache store failed: {e}")
+
+    def _entries(self):
+        """(mtime, size, path) of each file; ones deleted meanwhile are skipped"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self._count('evictions')
+
+    def report(self):
+        """Hit ratio, bytes saved and current size"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['bytes'] = sum(size for _, size, _ in self._entries())
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+tts_cache = AudioCache(os.getenv('TTS_CACHE_DIR', DEFAULT_TTS_CACHE_DIR), TTS_CACHE_MB * 1024 * 1024) \
+    if TTS_CACHE_ENABLED else None
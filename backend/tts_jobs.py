@@ -0,0 +1,169 @@
+"""Background text-to-speech for /web/process-audio.
+
+The reply goes back as soon as the LLM has answered; its audio is synthesized
+on a pool of TTS_WORKERS threads, with at most TTS_QUEUE_LIMIT jobs queued or
+running per worker process. Job state lives next to the audio in temp_audio,
+so whichever gunicorn worker gets GET /get-audio can answer it:
+
+    output_<id>.pending   accepted, audio not ready yet
+    output_<id>.mp3       ready, in TTS_AUDIO_FORMAT (written as .part,
+                          renamed when complete)
+    output_<id>.wav       WAV copy, made when a client asks for WAV
+    output_<id>.error     synthesis failed, holds the message
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tts import AUDIO_FORMATS, TTS_AUDIO_FORMAT, decode_to_wav, gen_audio_file
+
+# Resolved now: send_file would take a relative path from the app's root, not the working directory
+AUDIO_DIR = os.path.abspath('temp_audio')
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', 4))
+TTS_QUEUE_LIMIT = int(os.getenv('TTS_QUEUE_LIMIT', 32))
+# Longest GET /get-audio holds the request waiting for a pending job
+TTS_WAIT_SECONDS = float(os.getenv('TTS_WAIT_SECONDS', 10))
+# A job pending this long is treated as lost (e.g. its worker was restarted)
+TTS_JOB_TIMEOUT = int(os.getenv('TTS_JOB_TIMEOUT', 120))
+POLL_INTERVAL = 0.05
+
+os.makedirs(AUDIO_DIR, exist_ok=True)
+
+_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix='tts')
+_slots = threading.BoundedSemaphore(TTS_QUEUE_LIMIT)
+# Completion events of this process's jobs, so local waiters don't poll
+_done = {}
+_stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'synthesis_seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+def audio_path(audio_id, suffix=AUDIO_FORMATS[TTS_AUDIO_FORMAT][0]):
+    return os.path.join(AUDIO_DIR, f'output_{audio_id}.{suffix}')
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def submit_tts(audio_id, text):
+    """Queue synthesis of text as audio_id; False when the queue is full"""
+    if not _slots.acquire(blocking=False):
+        _count('rejected')
+        return False
+    open(audio_path(audio_id, 'pending'), 'w').close()
+    _done[audio_id] = threading.Event()
+    _count('submitted')
+    _executor.submit(_synthesize, audio_id, text)
+    return True
+
+
+def _synthesize(audio_id, text):
+    partial = audio_path(audio_id, f'{AUDIO_FORMATS[TTS_AUDIO_FORMAT][0]}.part')
+    start = time.perf_counter()
+    try:
+        gen_audio_file(partial, text, TTS_AUDIO_FORMAT)
+        os.replace(partial, audio_path(audio_id))
+        _count('completed')
+    except Exception as e:
+        print(f"TTS failed for {audio_id}: {e}")
+        with open(audio_path(audio_id, 'error'), 'w', encoding='utf-8') as f:
+            f.write(str(e))
+        if os.path.exists(partial):
+            os.remove(partial)
+        _count('failed')
+    finally:
+        _count('synthesis_seconds', time.perf_counter() - start)
+        # The result is in place before the marker goes, so readers never see neither
+        os.remove(audio_path(audio_id, 'pending'))
+        _slots.release()
+        _done.pop(audio_id).set()
+
+
+def _state(audio_id):
+    if os.path.exists(audio_path(audio_id)):
+        return 'ready'
+    if os.path.exists(audio_path(audio_id, 'error')):
+        return 'failed'
+    try:
+        age = time.time() - os.path.getmtime(audio_path(audio_id, 'pending'))
+    except OSError:
+        # Finished between the checks above, or never submitted
+        if os.path.exists(audio_path(audio_id)):
+            return 'ready'
+        return 'failed' if os.path.exists(audio_path(audio_id, 'error')) else 'missing'
+    return 'failed' if age > TTS_JOB_TIMEOUT else 'pending'
+
+
+def wait_seconds(value=None):
+    """A requested wait as seconds within [0, TTS_WAIT_SECONDS]; raises
+    ValueError unless it is a finite number"""
+    wait = TTS_WAIT_SECONDS if value is None else float(value)
+    if not math.isfinite(wait):
+        raise ValueError('wait must be a finite number')
+    return min(max(wait, 0.0), TTS_WAIT_SECONDS)
+
+
+def audio_status(audio_id, wait=TTS_WAIT_SECONDS):
+    """'ready', 'pending', 'failed' or 'missing', after waiting up to `wait`
+    seconds for a pending job to finish"""
+    deadline = time.monotonic() + wait_seconds(wait)
+    while True:
+        state = _state(audio_id)
+        remaining = deadline - time.monotonic()
+        if state != 'pending' or remaining <= 0:
+            return state
+        event = _done.get(audio_id)
+        if event:
+            event.wait(remaining)
+        else:
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+
+async def aaudio_status(audio_id, wait=TTS_WAIT_SECONDS):
+    """audio_status for the event loop; polls the job files instead of
+    holding a thread on the job's event"""
+    deadline = time.monotonic() + wait_seconds(wait)
+    while True:
+        state = _state(audio_id)
+        remaining = deadline - time.monotonic()
+        if state != 'pending' or remaining <= 0:
+            return state
+        await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+
+def audio_error(audio_id):
+    try:
+        with open(audio_path(audio_id, 'error'), encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return 'Audio generation timed out'
+
+
+def audio_file(audio_id, audio_format):
+    """(path, mimetype, extension) of a ready job's audio in audio_format,
+    which is TTS_AUDIO_FORMAT or wav"""
+    extension, mimetype, _ = AUDIO_FORMATS[audio_format]
+    path = audio_path(audio_id, extension)
+    if not os.path.exists(path):
+        decode_to_wav(audio_path(audio_id), path)
+    return path, mimetype, extension
+
+
+def remove_audio(audio_id):
+    for suffix in {extension for extension, _, _ in AUDIO_FORMATS.values()} | {'error'}:
+        if os.path.exists(audio_path(audio_id, suffix)):
+            os.remove(audio_path(audio_id, suffix))
+
+
+def tts_job_stats():
+    """This worker's job counters and current queue depth"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['synthesis_seconds'] = round(stats['synthesis_seconds'], 2)
+    stats['in_flight'] = len(_done)
+    stats['queue_limit'] = TTS_QUEUE_LIMIT
+    return stats
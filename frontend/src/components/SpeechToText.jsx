@@ -122,10 +122,18 @@ const SpeechToText = () => {
         timestamp: new Date().toLocaleTimeString()
       }]);
 
-      // Get audio response
-      const audioResponse = await axios.get(`${API_BASE_URL}/get-audio/${audio_id}`, {
-        responseType: 'blob'
-      });
+      // No audio when the server's speech queue is full
+      if (!audio_id) {
+        return;
+      }
+
+      // Get audio response; 202 means it is still being generated
+      let audioResponse;
+      do {
+        audioResponse = await axios.get(`${API_BASE_URL}/get-audio/${audio_id}`, {
+          responseType: 'blob'
+        });
+      } while (audioResponse.status === 202);
 
       const audioUrl = URL.createObjectURL(audioResponse.data);
       setAudioUrl(audioUrl);